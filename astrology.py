@@ -3,7 +3,7 @@
 # Zodiac analysis + astrology hints
 # Fully aligned with main.py
 
-from datetime import datetime
+from functools import lru_cache
 
 ZODIAC_SIGNS = [
     ("Capricorn", (12, 22), (1, 19)),
@@ -35,29 +35,86 @@ ASTROLOGY_HINTS = {
     "Void": "Your star sign is undefined. Unique paths await you."
 }
 
+# In-sentence variants used by the fortune composer (lowercase clauses
+# that read naturally mid-sentence, unlike the standalone hints above).
+ASTROLOGY_PHRASES = {
+    "Fire": "your passion lights hidden crossroads.",
+    "Water": "your intuition echoes in quiet pools.",
+    "Air": "your thoughts drift toward new horizons.",
+    "Earth": "your steps root change into practice.",
+    "Void": "the cosmos watches without shape."
+}
 
-def analyze_zodiac(birthdate_str):
-    """Returns (zodiac, element) tuple for a birthdate string YYYY-MM-DD"""
+
+# Precomputed day-of-year -> (sign, element) lookup. Built once at import
+# so analyze_zodiac is a single table index instead of a 12-entry scan.
+# Offsets use a leap year so Feb 29 resolves too.
+_DOY_OFFSET = (0, 31, 60, 91, 121, 152, 182, 213, 244, 274, 305, 335)
+_DAYS_IN_MONTH = (31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+
+def _build_zodiac_table():
+    table = [("Unknown", "Void")] * 367
+    for month in range(1, 13):
+        month_days = (_DOY_OFFSET[month] if month < 12 else 366) - _DOY_OFFSET[month - 1]
+        for day in range(1, month_days + 1):
+            for sign, start, end in ZODIAC_SIGNS:
+                if (month == start[0] and day >= start[1]) or \
+                   (month == end[0] and day <= end[1]):
+                    table[_DOY_OFFSET[month - 1] + day] = (sign, get_element(sign))
+                    break
+    return table
+
+
+@lru_cache(maxsize=4096)
+def _analyze_zodiac_cached(birthdate_str):
+    """Memoized core of analyze_zodiac over hashable birthdate strings."""
+    # Manual split/int parse: only month and day matter here, and
+    # strptime's format-string machinery is ~10x slower than this.
     try:
-        date_obj = datetime.strptime(birthdate_str, "%Y-%m-%d")
-        for sign, start, end in ZODIAC_SIGNS:
-            if (date_obj.month == start[0] and date_obj.day >= start[1]) or \
-               (date_obj.month == end[0] and date_obj.day <= end[1]):
-                element = get_element(sign)
-                return sign, element
+        _y, m, d = birthdate_str.split("-", 2)
+        month = int(m)
+        day = int(d[:2])
+        if 1 <= month <= 12 and 1 <= day <= _DAYS_IN_MONTH[month - 1]:
+            return _ZODIAC_BY_DOY[_DOY_OFFSET[month - 1] + day]
         return "Unknown", "Void"
     except Exception:
         return "Unknown", "Void"
 
 
+def analyze_zodiac(birthdate_str):
+    """Returns (zodiac, element) tuple for a birthdate string YYYY-MM-DD"""
+    try:
+        return _analyze_zodiac_cached(birthdate_str)
+    except TypeError:
+        # unhashable input (e.g. a list from a malformed request) — the
+        # cache raises before the parser's own except can answer, so
+        # compute without it and keep the never-raises contract
+        return _analyze_zodiac_cached.__wrapped__(birthdate_str)
+
+
+# Callers clear the zodiac cache through the public name.
+analyze_zodiac.cache_clear = _analyze_zodiac_cached.cache_clear
+
+
+# Inverted sign -> element map so get_element is a dict hit rather than a
+# scan over ELEMENTS on every call.
+_ELEMENT_BY_SIGN = {sign: elem for elem, signs in ELEMENTS.items() for sign in signs}
+
+
 def get_element(sign):
     """Returns element type for a zodiac sign"""
-    for elem, signs in ELEMENTS.items():
-        if sign in signs:
-            return elem
-    return "Void"
+    return _ELEMENT_BY_SIGN.get(sign, "Void")
+
+
+_ZODIAC_BY_DOY = _build_zodiac_table()
 
 
 def astrology_hint(element):
     """Returns a descriptive hint for a zodiac element"""
     return ASTROLOGY_HINTS.get(element, ASTROLOGY_HINTS["Void"])
+
+
+def astrology_phrase(element):
+    """Returns a short in-sentence astrology phrase for an element"""
+    return ASTROLOGY_PHRASES.get(element, "")
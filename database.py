@@ -4,18 +4,77 @@
 # Categories now are:
 # emotion, focus, intuition, trust, reflection
 
+import json
 import sqlite3
 from pathlib import Path
 from datetime import date
 
+from astrology import analyze_zodiac
+
+# Bump when the schema changes; lets initialize_tables fast-path exit on
+# databases already at the current version.
+SCHEMA_VERSION = 1
+
+# Hot-path SQL as module constants: sqlite3 keys its prepared-statement
+# cache on string identity, so stable literals skip re-parsing the SQL
+# on every call.
+SQL_UPSERT_USER = """
+    INSERT INTO users (name, birthdate, zodiac, element)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(name) DO UPDATE SET
+        birthdate=excluded.birthdate,
+        zodiac=excluded.zodiac,
+        element=excluded.element
+    RETURNING id
+"""
+SQL_INSERT_USER_IGNORE = (
+    "INSERT OR IGNORE INTO users (name, birthdate, zodiac, element) VALUES (?, ?, ?, ?)"
+)
+SQL_INSERT_QUIZ = """
+    INSERT INTO quiz_responses
+    (user_id, date, emotion, focus, intuition, trust, reflection)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_INSERT_QUIZ_JSON = (
+    "INSERT INTO quiz_responses_json (user_id, date, profile_json) VALUES (?, ?, ?)"
+)
+SQL_INSERT_FORTUNE = "INSERT INTO fortunes (user_id, date, fortune) VALUES (?, ?, ?)"
+SQL_SELECT_USER_ID = "SELECT id FROM users WHERE name=?"
+SQL_SELECT_HISTORY = """
+    SELECT date, emotion, focus, intuition, trust, reflection
+    FROM quiz_responses
+    WHERE user_id=?
+    ORDER BY date DESC
+"""
+
 class DatabaseHandler:
     def __init__(self, db_path: str):
         self.db_path = db_path
         self.conn = None
 
     def connect(self):
-        self.conn = sqlite3.connect(self.db_path, timeout=5)
-        self.conn.row_factory = sqlite3.Row
+        # Reuse a single cached connection for the lifetime of the handler.
+        # Opening per call pays file-open + schema-parse costs on every save,
+        # which dominates latency in the UI-driven hot path.
+        if self.conn is None:
+            self.conn = sqlite3.connect(
+                self.db_path, timeout=5, check_same_thread=False,
+                cached_statements=256
+            )
+            self.conn.row_factory = sqlite3.Row
+            # Tune pragmas once per connection: WAL avoids an fsync per
+            # commit, synchronous=NORMAL keeps durability reasonable for
+            # user data (unlike OFF), and a bigger cache + mmap cuts read
+            # syscalls. Safe to ignore failures on exotic filesystems.
+            try:
+                c = self.conn.cursor()
+                c.execute("PRAGMA journal_mode=WAL")
+                c.execute("PRAGMA synchronous=NORMAL")
+                c.execute("PRAGMA cache_size=-20000")
+                c.execute("PRAGMA temp_store=MEMORY")
+                c.execute("PRAGMA mmap_size=268435456")
+            except Exception:
+                pass
         return self.conn
 
     def close(self):
@@ -26,6 +85,16 @@ class DatabaseHandler:
                 pass
             self.conn = None
 
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
     # -------------------------------------------------
     # CREATE TABLES (updated to correct categories)
     # -------------------------------------------------
@@ -33,6 +102,15 @@ class DatabaseHandler:
         conn = self.connect()
         c = conn.cursor()
 
+        # Fast path: schema already at the current version — skip the DDL
+        # and the migration scan entirely.
+        try:
+            c.execute("PRAGMA user_version")
+            if c.fetchone()[0] >= SCHEMA_VERSION:
+                return
+        except Exception:
+            pass
+
         # Users
         c.execute("""
             CREATE TABLE IF NOT EXISTS users (
@@ -70,6 +148,12 @@ class DatabaseHandler:
             )
         """)
 
+        # Indexes: keep name lookups and per-user history scans O(log N)
+        # instead of full table scans as the tables grow.
+        c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_name ON users(name)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_quiz_user_date ON quiz_responses(user_id, date DESC)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_fortunes_user_date ON fortunes(user_id, date DESC)")
+
         conn.commit()
         # Ensure migrations: add missing columns to quiz_responses if DB pre-exists with older schema
         try:
@@ -77,87 +161,124 @@ class DatabaseHandler:
             existing = {row[1] for row in c.fetchall()}  # row[1] is column name
             needed = {"emotion", "focus", "intuition", "trust", "reflection"}
             to_add = needed - existing
-            for col in to_add:
-                try:
-                    c.execute(f"ALTER TABLE quiz_responses ADD COLUMN {col} INTEGER DEFAULT 0")
-                except Exception:
-                    pass
-            conn.commit()
+            if to_add:
+                # One script, one schema lock: the table_info check above
+                # already guarantees each ALTER is applicable, so no
+                # per-column try/except is needed. (DDL cannot take bound
+                # parameters; the column names are our own constants.)
+                script = ";\n".join(
+                    f"ALTER TABLE quiz_responses ADD COLUMN {col} INTEGER DEFAULT 0"
+                    for col in sorted(to_add)
+                )
+                c.executescript(f"BEGIN;\n{script};\nCOMMIT;")
         except Exception:
             pass
 
-        self.close()
+        # Record the schema version only after tables + migrations succeeded.
+        try:
+            c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+        except Exception:
+            pass
 
     # -------------------------------------------------
     # SAVE RESULT (UPDATED categories)
     # -------------------------------------------------
     def save_user_result(self, name, birthdate, profile: dict, fortune_text: str):
+        self.save_user_results_bulk([(name, birthdate, profile, fortune_text)])
+
+    def save_user_results_bulk(self, records):
+        """Save many (name, birthdate, profile, fortune_text) records at once.
+
+        All rows go through executemany inside a single transaction, so bulk
+        imports/restores pay one commit instead of one per record.
+        """
+        if not records:
+            return
         conn = self.connect()
         c = conn.cursor()
 
-        # Zodiac
-        from astrology import analyze_zodiac
-        zodiac, element = analyze_zodiac(birthdate)
+        today = date.today().isoformat()
 
-        # Insert or fetch user
-        c.execute("SELECT id FROM users WHERE name=?", (name,))
-        row = c.fetchone()
-        if row:
-            user_id = row["id"]
-        else:
-            c.execute(
-                "INSERT INTO users (name, birthdate, zodiac, element) VALUES (?, ?, ?, ?)",
-                (name, birthdate, zodiac, element)
-            )
-            user_id = c.lastrowid
+        def _int(v):
+            try:
+                return int(v)
+            except Exception:
+                return 0
+
+        users_rows = []
+        for name, birthdate, _profile, _fortune in records:
+            zodiac, element = analyze_zodiac(birthdate)
+            users_rows.append((name, birthdate, zodiac, element))
 
-        # Insert quiz response (UPDATED)
         try:
-            c.execute("""
-                INSERT INTO quiz_responses
-                (user_id, date, emotion, focus, intuition, trust, reflection)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                user_id,
-                date.today().isoformat(),
-                int(profile.get("emotion", 0)),
-                int(profile.get("focus", 0)),
-                int(profile.get("intuition", 0)),
-                int(profile.get("trust", 0)),
-                int(profile.get("reflection", 0))
-            ))
-        except Exception as e:
-            # Fallback: older DB schema — store profile as JSON in a safe fallback table
+            id_by_name = None
+            if len(users_rows) == 1:
+                # Single-record hot path: one UPSERT with RETURNING instead
+                # of an insert plus a lookup (SQLite >= 3.35).
+                try:
+                    c.execute(SQL_UPSERT_USER, users_rows[0])
+                    id_by_name = {users_rows[0][0]: c.fetchone()[0]}
+                except sqlite3.OperationalError:
+                    id_by_name = None
+            if id_by_name is None:
+                # Insert missing users; UNIQUE(name) makes OR IGNORE a cheap dedupe
+                c.executemany(SQL_INSERT_USER_IGNORE, users_rows)
+                names = [r[0] for r in users_rows]
+                placeholders = ",".join("?" * len(names))
+                c.execute(f"SELECT id, name FROM users WHERE name IN ({placeholders})", names)
+                id_by_name = {row["name"]: row["id"] for row in c.fetchall()}
+
+            quiz_rows = []
+            fortune_rows = []
+            for name, birthdate, profile, fortune_text in records:
+                user_id = id_by_name.get(name)
+                profile = profile or {}
+                quiz_rows.append((
+                    user_id,
+                    today,
+                    _int(profile.get("emotion", 0)),
+                    _int(profile.get("focus", 0)),
+                    _int(profile.get("intuition", 0)),
+                    _int(profile.get("trust", 0)),
+                    _int(profile.get("reflection", 0))
+                ))
+                fortune_rows.append((user_id, today, fortune_text))
+
+            # Insert quiz responses (UPDATED)
             try:
-                c.execute("""
-                    CREATE TABLE IF NOT EXISTS quiz_responses_json (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER,
-                        date TEXT,
-                        profile_json TEXT,
-                        FOREIGN KEY(user_id) REFERENCES users(id)
-                    )
-                """)
-                c.execute(
-                    "INSERT INTO quiz_responses_json (user_id, date, profile_json) VALUES (?, ?, ?)",
-                    (user_id, date.today().isoformat(), json.dumps(profile))
-                )
+                c.executemany(SQL_INSERT_QUIZ, quiz_rows)
             except Exception:
-                # Last resort: ignore saving quiz responses but continue with fortunes
-                pass
+                # Fallback: older DB schema — store profiles as JSON in a safe fallback table
+                try:
+                    c.execute("""
+                        CREATE TABLE IF NOT EXISTS quiz_responses_json (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            user_id INTEGER,
+                            date TEXT,
+                            profile_json TEXT,
+                            FOREIGN KEY(user_id) REFERENCES users(id)
+                        )
+                    """)
+                    c.executemany(
+                        SQL_INSERT_QUIZ_JSON,
+                        [(id_by_name.get(name), today, json.dumps(profile or {}))
+                         for name, _birthdate, profile, _fortune in records]
+                    )
+                except Exception:
+                    # Last resort: ignore saving quiz responses but continue with fortunes
+                    pass
 
-        # Insert fortune
-        c.execute("""
-            INSERT INTO fortunes (user_id, date, fortune)
-            VALUES (?, ?, ?)
-        """, (
-            user_id,
-            date.today().isoformat(),
-            fortune_text
-        ))
+            # Insert fortunes
+            c.executemany(SQL_INSERT_FORTUNE, fortune_rows)
 
-        conn.commit()
-        self.close()
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
 
     # -------------------------------------------------
     # USER HISTORY
@@ -167,22 +288,15 @@ class DatabaseHandler:
         c = conn.cursor()
 
         # Fetch user ID
-        c.execute("SELECT id FROM users WHERE name=?", (username,))
+        c.execute(SQL_SELECT_USER_ID, (username,))
         row = c.fetchone()
         if not row:
-            self.close()
             return []
 
         user_id = row["id"]
 
         # UPDATED fields
-        c.execute("""
-            SELECT date, emotion, focus, intuition, trust, reflection
-            FROM quiz_responses
-            WHERE user_id=?
-            ORDER BY date DESC
-        """, (user_id,))
+        c.execute(SQL_SELECT_HISTORY, (user_id,))
 
         rows = [dict(r) for r in c.fetchall()]
-        self.close()
         return rows
@@ -19,28 +19,39 @@ Note:
 
 # Standard library
 import os
+import re
 import json
+import time
 import random
+import sqlite3
 import traceback
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Any, Dict, List, Optional, Tuple, Union
 from collections import Counter
+from operator import itemgetter
 
 # Local configuration (change as needed)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MEMORY_FILE = os.path.join(BASE_DIR, "mirror_memory.json")
+MEMORY_DB = os.path.join(BASE_DIR, "mirror_memory.sqlite")
+MEMORY_FILE = os.path.join(BASE_DIR, "mirror_memory.json")   # legacy snapshot, folded into MEMORY_DB once
+MEMORY_LOG = os.path.join(BASE_DIR, "mirror_memory.jsonl")   # legacy append log, folded into MEMORY_DB once
 MODEL_NAME = "distilgpt2"   # small-ish GPT-2 derivative; replace if you choose a different small model
 KEEP_HISTORY = 12           # keep last N fortunes for each user
 MAX_PROMPT_TOKENS = 3000    # token cap for prompts (safety)
 MAX_NEW_TOKENS = 180        # how many new tokens to generate when using ML
 DEBUG_MODE = False          # flip to True for verbose console logging
+USE_INT8 = True             # dynamic int8 weight quantization for on-device CPU inference
 
-# Optional ML backend: lazy import
+# Optional ML backend: fully lazy import. find_spec only probes the
+# importer metadata, so module import stays fast even when transformers
+# (and its torch dependency chain) is installed — the real import happens
+# inside init_model on first use.
 # IMPORTANT: Set FORCE_RULE_BASED = True to disable ML entirely and use rule-based fallback only
 FORCE_RULE_BASED = True  # Set to False to enable ML fortune generation
 try:
-    from transformers import GPT2LMHeadModel, GPT2TokenizerFast
-    TRANSFORMERS_AVAILABLE = True and not FORCE_RULE_BASED
+    from importlib.util import find_spec
+    TRANSFORMERS_AVAILABLE = find_spec("transformers") is not None and not FORCE_RULE_BASED
 except Exception:
     TRANSFORMERS_AVAILABLE = False
 
@@ -48,6 +59,10 @@ except Exception:
 _model = None
 _tokenizer = None
 
+# Dedicated RNG instance: avoids contending on the random-module global
+# under threaded servers and keeps this module's sampling self-contained.
+_RNG = random.Random()
+
 # ================================
 # Utility / Logging
 # ================================
@@ -58,14 +73,36 @@ def debug_log(*args, **kwargs):
         now = datetime.now().isoformat()
         print(f"[fortune_engine DEBUG {now}]", *args, **kwargs)
 
+# JSON codec: prefer orjson (3-10x faster, emits bytes directly) and fall
+# back to stdlib json when it isn't installed — same pattern as the
+# optional transformers dependency.
+try:
+    import orjson
+
+    def _dumps(data: Any) -> bytes:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2)
+
+    def _dumps_compact(data: Any) -> str:
+        return orjson.dumps(data).decode("utf-8")
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(data: Any) -> bytes:
+        return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+    def _dumps_compact(data: Any) -> str:
+        return json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+
+    _loads = json.loads
+
 def safe_load_json(path: str) -> Dict[str, Any]:
     """Load JSON safely; return empty dict on failure."""
     try:
         if not os.path.exists(path):
             debug_log(f"safe_load_json: file not found: {path}")
             return {}
-        with open(path, "r", encoding="utf-8") as fh:
-            data = json.load(fh)
+        with open(path, "rb") as fh:
+            data = _loads(fh.read())
             debug_log(f"safe_load_json: loaded {len(data)} top-level keys from {path}")
             return data
     except Exception as e:
@@ -77,8 +114,8 @@ def safe_write_json(path: str, data: Dict[str, Any]) -> bool:
     """Write JSON safely: write to temp file and atomic-rename. Returns True on success."""
     try:
         tmp = path + ".tmp"
-        with open(tmp, "w", encoding="utf-8") as fh:
-            json.dump(data, fh, indent=2, ensure_ascii=False)
+        with open(tmp, "wb") as fh:
+            fh.write(_dumps(data))
         os.replace(tmp, path)
         debug_log(f"safe_write_json: wrote {len(data)} top-level keys to {path}")
         return True
@@ -93,134 +130,272 @@ def safe_write_json(path: str, data: Dict[str, Any]) -> bool:
         return False
 
 # ================================
-# Memory: load / save / append
+# Memory: SQLite-backed per-user history
 # ================================
 
+# The memory store lives in SQLite: fetching one user's history is an
+# index seek instead of parsing the whole JSON blob for every user, and
+# the purge/export paths become single SQL statements. Legacy snapshot
+# and log files are folded in once at first connect and renamed
+# *.migrated so they are never re-read.
+
+_MEM_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS entries (
+        name TEXT NOT NULL,
+        timestamp TEXT NOT NULL,
+        ts_epoch INTEGER NOT NULL,
+        zodiac TEXT,
+        tone TEXT,
+        theme TEXT,
+        fortune TEXT,
+        PRIMARY KEY (name, timestamp)
+    )
+"""
+SQL_MEM_INSERT = """
+    INSERT OR IGNORE INTO entries (name, timestamp, ts_epoch, zodiac, tone, theme, fortune)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+SQL_MEM_HISTORY = """
+    SELECT timestamp, ts_epoch, zodiac, tone, theme, fortune
+    FROM entries WHERE name=?
+    ORDER BY ts_epoch DESC, rowid DESC LIMIT ?
+"""
+SQL_MEM_TRIM = """
+    DELETE FROM entries WHERE name=? AND rowid IN (
+        SELECT rowid FROM entries WHERE name=?
+        ORDER BY ts_epoch DESC, rowid DESC LIMIT -1 OFFSET ?
+    )
+"""
+
+_mem_conn = None
+
+def _entry_epoch(rec: Dict[str, Any]) -> int:
+    """Epoch seconds for an entry; legacy records pay one fromisoformat."""
+    ep = rec.get("ts_epoch")
+    if ep is not None:
+        return ep
+    try:
+        return int(datetime.fromisoformat(rec.get("timestamp")).timestamp())
+    except Exception:
+        return 0
+
+def _migrate_legacy_memory(conn) -> None:
+    """Fold the old JSON snapshot + JSONL log into the SQLite store once."""
+    rows = []
+    mem = safe_load_json(MEMORY_FILE) if os.path.exists(MEMORY_FILE) else {}
+    if isinstance(mem, dict):
+        for name, hist in mem.items():
+            for h in hist if isinstance(hist, list) else []:
+                rows.append((name, h.get("timestamp") or "", _entry_epoch(h),
+                             h.get("zodiac"), h.get("tone"), h.get("theme"), h.get("fortune")))
+    if os.path.exists(MEMORY_LOG):
+        with open(MEMORY_LOG, "r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = _loads(line)
+                except Exception:
+                    continue
+                name = rec.pop("name", None)
+                if not name:
+                    continue
+                rows.append((name, rec.get("timestamp") or "", _entry_epoch(rec),
+                             rec.get("zodiac"), rec.get("tone"), rec.get("theme"), rec.get("fortune")))
+    if rows:
+        conn.executemany(SQL_MEM_INSERT, rows)
+        conn.commit()
+        debug_log(f"_migrate_legacy_memory: folded {len(rows)} legacy entries into {MEMORY_DB}")
+    for path in (MEMORY_FILE, MEMORY_LOG):
+        try:
+            if os.path.exists(path):
+                os.replace(path, path + ".migrated")
+        except Exception:
+            pass
+
+def _memory_conn():
+    """Lazily open (and cache) the memory DB connection, migrating legacy files."""
+    global _mem_conn
+    if _mem_conn is None:
+        conn = sqlite3.connect(
+            MEMORY_DB, timeout=5, check_same_thread=False, cached_statements=64
+        )
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+        except Exception:
+            pass
+        conn.execute(_MEM_SCHEMA)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_ts ON entries(ts_epoch)")
+        conn.commit()
+        try:
+            _migrate_legacy_memory(conn)
+        except Exception as e:
+            print(f"[fortune_engine] legacy memory migration failed: {e}")
+            debug_log(traceback.format_exc())
+        _mem_conn = conn
+    return _mem_conn
+
+def _row_entry(r) -> Dict[str, Any]:
+    return {
+        "timestamp": r["timestamp"],
+        "ts_epoch": r["ts_epoch"],
+        "fortune": r["fortune"],
+        "zodiac": r["zodiac"],
+        "tone": r["tone"],
+        "theme": r["theme"],
+    }
+
 def load_memory() -> Dict[str, List[Dict[str, Any]]]:
-    """Load the mirror memory (per-user fortunes)."""
-    mem = safe_load_json(MEMORY_FILE)
-    if not isinstance(mem, dict):
-        debug_log("load_memory: memory file root not dict — resetting.")
-        mem = {}
-    return mem
+    """Return the full memory as {name: [entries oldest-first]}.
+
+    Kept for whole-store consumers (export, batch seeding); per-user
+    callers should prefer get_user_history, which is an index seek.
+    Each call builds a fresh dict, so mutation is always safe.
+    """
+    try:
+        c = _memory_conn().execute(
+            "SELECT name, timestamp, ts_epoch, zodiac, tone, theme, fortune "
+            "FROM entries ORDER BY name, ts_epoch, rowid"
+        )
+        mem: Dict[str, List[Dict[str, Any]]] = {}
+        for r in c:
+            mem.setdefault(r["name"], []).append(_row_entry(r))
+        return mem
+    except Exception as e:
+        print(f"[fortune_engine] load_memory failed: {e}")
+        debug_log(traceback.format_exc())
+        return {}
 
 def save_memory(mem: Dict[str, List[Dict[str, Any]]]) -> bool:
-    """Persist memory to disk."""
-    return safe_write_json(MEMORY_FILE, mem)
+    """Replace the whole memory store with `mem` (bulk import/restore)."""
+    try:
+        conn = _memory_conn()
+        rows = [
+            (name, h.get("timestamp") or "", _entry_epoch(h),
+             h.get("zodiac"), h.get("tone"), h.get("theme"), h.get("fortune"))
+            for name, hist in (mem or {}).items()
+            for h in hist
+        ]
+        conn.execute("DELETE FROM entries")
+        conn.executemany(SQL_MEM_INSERT, rows)
+        conn.commit()
+        debug_log(f"save_memory: wrote {len(rows)} entries to {MEMORY_DB}")
+        return True
+    except Exception as e:
+        print(f"[fortune_engine] save_memory failed: {e}")
+        debug_log(traceback.format_exc())
+        try:
+            _memory_conn().rollback()
+        except Exception:
+            pass
+        return False
 
 def append_memory_entry(name: str, fortune_text: str, zodiac: str, tone: str, theme: Optional[str]=None) -> None:
-    """Append an entry to the user's fortune history and persist."""
+    """Append an entry to the user's fortune history and trim to KEEP_HISTORY."""
     try:
-        mem = load_memory()
-        history = mem.get(name, [])
-        entry = {
-            "timestamp": datetime.now().isoformat(),
-            "fortune": fortune_text,
-            "zodiac": zodiac,
-            "tone": tone,
-            "theme": theme or guess_theme_from_text(fortune_text)
-        }
-        history.append(entry)
-        mem[name] = history[-KEEP_HISTORY:]
-        save_memory(mem)
-        debug_log(f"append_memory_entry: appended entry for {name}; history length now {len(mem[name])}")
+        now = datetime.now()
+        conn = _memory_conn()
+        conn.execute(SQL_MEM_INSERT, (
+            name, now.isoformat(), int(now.timestamp()),
+            zodiac, tone, theme or guess_theme_from_text(fortune_text), fortune_text
+        ))
+        conn.execute(SQL_MEM_TRIM, (name, name, KEEP_HISTORY))
+        conn.commit()
+        debug_log(f"append_memory_entry: appended entry for {name}")
     except Exception as e:
         print(f"[fortune_engine] append_memory_entry failed: {e}")
         debug_log(traceback.format_exc())
 
 def get_user_history(name: str) -> List[Dict[str, Any]]:
-    """Return history list for name (empty list if not found)."""
-    mem = load_memory()
-    return mem.get(name, [])
+    """Return history list for name, oldest-first (empty list if not found)."""
+    try:
+        rows = _memory_conn().execute(SQL_MEM_HISTORY, (name, KEEP_HISTORY)).fetchall()
+        return [_row_entry(r) for r in reversed(rows)]
+    except Exception as e:
+        print(f"[fortune_engine] get_user_history failed: {e}")
+        debug_log(traceback.format_exc())
+        return []
 
 # ================================
 # Astrology helpers
 # ================================
 
-def analyze_zodiac(birthdate: str) -> Tuple[str, str]:
-    """Return zodiac sign and element given a birthdate string (ISO-like)."""
-    try:
-        parts = birthdate.split("-")
-        if len(parts) < 3:
-            debug_log("analyze_zodiac: invalid birthdate format", birthdate)
-            return "Unknown", "Void"
-        month = int(parts[1]); day = int(parts[2])
-    except Exception:
-        debug_log("analyze_zodiac: parse failed for", birthdate)
-        return "Unknown", "Void"
-
-    signs = [
-        ((1,20,2,18), "Aquarius", "Air"),
-        ((2,19,3,20), "Pisces", "Water"),
-        ((3,21,4,19), "Aries", "Fire"),
-        ((4,20,5,20), "Taurus", "Earth"),
-        ((5,21,6,20), "Gemini", "Air"),
-        ((6,21,7,22), "Cancer", "Water"),
-        ((7,23,8,22), "Leo", "Fire"),
-        ((8,23,9,22), "Virgo", "Earth"),
-        ((9,23,10,22), "Libra", "Air"),
-        ((10,23,11,21), "Scorpio", "Water"),
-        ((11,22,12,21), "Sagittarius", "Fire"),
-        ((12,22,1,19), "Capricorn", "Earth")
-    ]
-    for (m1,d1,m2,d2), sign, element in signs:
-        if (month == m1 and day >= d1) or (month == m2 and day <= d2):
-            return sign, element
-    return "Unknown", "Void"
-
-def astrology_hint(element: str) -> str:
-    """Return a short astrology-inspired hint string for an element."""
-    hints = {
-        "Fire": "your passion lights hidden crossroads.",
-        "Water": "your intuition echoes in quiet pools.",
-        "Air": "your thoughts drift toward new horizons.",
-        "Earth": "your steps root change into practice.",
-        "Void": "the cosmos watches without shape."
-    }
-    return hints.get(element, "")
+# Deduplicated into astrology.py: one precomputed zodiac table shared by
+# both modules instead of a second divergent copy here. The composer's
+# in-sentence phrases now live there as astrology_phrase.
+from astrology import analyze_zodiac, astrology_phrase as astrology_hint
 
 # ================================
 # Personality signature computation
 # ================================
 
-def compute_personality_signature(profile: Dict[str, Any]) -> Tuple[str, str]:
-    """
-    Derive a tone and dominant trait from the numeric traits in profile.
-    Profile is expected to be a mapping of trait -> numeric or numeric-like string.
-    Returns: (tone, dominant_trait)
-    """
-    if not profile or not isinstance(profile, dict):
-        return "neutral", "unknown"
-    vals = []
-    numeric_map = {}
-    for k, v in profile.items():
+@lru_cache(maxsize=2048)
+def _signature_from_items(items: Tuple[Tuple[str, Any], ...]) -> Tuple[str, str]:
+    """Memoized core of compute_personality_signature over hashable items."""
+    # Single fused pass: track sum, count and running max together instead
+    # of building two intermediate containers and re-scanning them.
+    total = 0.0
+    count = 0
+    dominant = None
+    dominant_val = float("-inf")
+    for k, v in items:
         try:
             fv = float(v)
-            vals.append(fv)
-            numeric_map[k] = fv
         except Exception:
             # skip non-numeric (but leave available for ML prompt)
             continue
-    if not vals:
+        total += fv
+        count += 1
+        if fv > dominant_val:
+            dominant_val = fv
+            dominant = k
+    if not count:
         return "neutral", "unknown"
-    avg = sum(vals) / len(vals)
+    avg = total / count
     if avg >= 4.2:
         tone = "bright"
     elif avg >= 2.6:
         tone = "neutral"
     else:
         tone = "dark"
-
-    try:
-        dominant = max(numeric_map.keys(), key=lambda k: numeric_map[k])
-    except Exception:
-        dominant = list(profile.keys())[0] if profile else "unknown"
     debug_log(f"compute_personality_signature: avg={avg:.2f}, tone={tone}, dominant={dominant}")
     return tone, dominant
 
+def compute_personality_signature(profile: Dict[str, Any]) -> Tuple[str, str]:
+    """
+    Derive a tone and dominant trait from the numeric traits in profile.
+    Profile is expected to be a mapping of trait -> numeric or numeric-like string.
+    Returns: (tone, dominant_trait)
+
+    Results are memoized on the profile items — repeated quizzes with the
+    same answers skip the arithmetic entirely.
+    """
+    if not profile or not isinstance(profile, dict):
+        return "neutral", "unknown"
+    items = tuple(profile.items())
+    try:
+        return _signature_from_items(items)
+    except TypeError:
+        # unhashable values — compute without the cache
+        return _signature_from_items.__wrapped__(items)
+
+# Hour-of-day cache: refreshed at most once a minute (monotonic clock)
+# so each fortune skips the wall-clock syscall.
+_HOUR_CACHE = {"t": float("-inf"), "hour": -1}
+
+def _current_hour() -> int:
+    now = time.monotonic()
+    if now - _HOUR_CACHE["t"] > 60:
+        _HOUR_CACHE["hour"] = datetime.now().hour
+        _HOUR_CACHE["t"] = now
+    return _HOUR_CACHE["hour"]
+
 def temporal_tone_adjust(tone: str) -> str:
     """Slightly shift the tone by the hour of the day to give varied fortunes."""
-    h = datetime.now().hour
+    h = _current_hour()
     if 22 <= h or h <= 5:
         if tone == "bright":
             return "neutral"
@@ -234,66 +409,75 @@ def temporal_tone_adjust(tone: str) -> str:
 # Rule-based composer (fallback)
 # ================================
 
-# Expand vocabulary with many entries so the file is more robust
+# Expand vocabulary with many entries so the file is more robust.
+# Tuples rather than lists: immutable, slightly faster to index, and safe
+# to share across threads.
 VOCAB = {
-    "themes": [
+    "themes": (
         "reflection","destiny","memory","light","shadow","echo","flux","grace",
         "illusion","time","horizon","truth","dream","origin","stillness","threshold",
         "tide","constellation","pulse","garden"
-    ],
-    "adjectives": [
+    ),
+    "adjectives": (
         "celestial","velvet","haunting","luminous","ashen","resonant",
         "ancient","radiant","forgotten","opalescent","gilded","nocturnal",
         "transcendent","serpentine","quiet"
-    ],
+    ),
     "tones": {
-        "bright": [
+        "bright": (
             "A golden light crowns your choices today.",
             "The mirror smiles upon this turning of the page.",
             "New paths unfold just beyond your steady step."
-        ],
-        "neutral": [
+        ),
+        "neutral": (
             "Balance lingers at the glass; take another breath.",
             "A quiet clarity ripples beneath your surface.",
             "Consider the space between intent and action."
-        ],
-        "dark": [
+        ),
+        "dark": (
             "Shadows stir where the mirror does not reach.",
             "A hush warns: not all reflections are truth.",
             "Tread with curiosity and measured caution tonight."
-        ]
+        )
     },
-    "omens": [
+    "omens": (
         "a bird's wing caught in the current of morning",
         "the scent of rain on ancient stone",
         "a laugh from a stranger who knows your secret",
         "a folded note you've not yet found",
         "a glint that isn't yours"
-    ]
+    )
 }
 
+# Per-tone choice table resolved once at import; unknown tones fall back
+# to the neutral lines without a per-call .get default lookup.
+_TONE_LINES = dict(VOCAB["tones"])
+_NEUTRAL_LINES = _TONE_LINES["neutral"]
+
+# Compiled multi-pattern alternation, built once at import: one linear
+# scan finds every theme occurrence no matter how large the vocabulary grows.
+_THEME_RE = re.compile(r"\b(" + "|".join(map(re.escape, VOCAB["themes"])) + r")\b")
+
 def guess_theme_from_text(text: str) -> str:
     """Heuristic to pick a theme from a piece of text; naive but useful."""
-    text_low = (text or "").lower()
-    counts = {}
-    for t in VOCAB["themes"]:
-        counts[t] = text_low.count(t)
+    counts = Counter(_THEME_RE.findall((text or "").lower()))
+    if counts:
+        # max over items is a single pass; most_common(1) goes through
+        # heapq.nlargest machinery for the same answer.
+        return max(counts.items(), key=itemgetter(1))[0]
     # fallback to random theme if none obvious
-    top = sorted(counts.items(), key=lambda kv: kv[1], reverse=True)
-    if top and top[0][1] > 0:
-        return top[0][0]
-    return random.choice(VOCAB["themes"])
+    return _RNG.choice(VOCAB["themes"])
 
 def rule_based_fortune(name: str, zodiac: str, element: str, tone: str, dominant: str, history: List[Dict[str, Any]]) -> str:
     """
     Compose a rule-based poetic fortune using vocabulary and simple heuristics.
     Returns the fortune string.
     """
-    theme = random.choice(VOCAB["themes"])
-    adj = random.choice(VOCAB["adjectives"])
-    omen = random.choice(VOCAB["omens"])
+    theme = _RNG.choice(VOCAB["themes"])
+    adj = _RNG.choice(VOCAB["adjectives"])
+    omen = _RNG.choice(VOCAB["omens"])
     tone = temporal_tone_adjust(tone)
-    tone_line = random.choice(VOCAB["tones"].get(tone, VOCAB["tones"]["neutral"]))
+    tone_line = _RNG.choice(_TONE_LINES.get(tone, _NEUTRAL_LINES))
     memory_hint = ""
     if history:
         try:
@@ -330,6 +514,14 @@ def init_model() -> bool:
         return True
     try:
         debug_log("init_model: loading tokenizer and model:", MODEL_NAME)
+        from transformers import GPT2LMHeadModel, GPT2TokenizerFast
+        # Cap intra-op threads so inference doesn't oversubscribe the host
+        # alongside the web workers.
+        try:
+            import torch
+            torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+        except Exception:
+            pass
         _tokenizer = GPT2TokenizerFast.from_pretrained(MODEL_NAME)
         # Ensure pad token exists
         if _tokenizer.pad_token_id is None:
@@ -337,6 +529,45 @@ def init_model() -> bool:
             _tokenizer.pad_token = _tokenizer.eos_token
         _model = GPT2LMHeadModel.from_pretrained(MODEL_NAME)
         _model.eval()
+        # On-device (phone/CPU) target: int8 weight-only quantization cuts
+        # the weight footprint ~4x and speeds up the Linear matmuls on
+        # CPUs with dot-product instructions.
+        quantized = False
+        if USE_INT8:
+            try:
+                import torch
+                if not torch.cuda.is_available():
+                    _model = torch.ao.quantization.quantize_dynamic(
+                        _model, {torch.nn.Linear}, dtype=torch.qint8
+                    )
+                    quantized = True
+                    debug_log("init_model: applied dynamic int8 quantization")
+            except Exception:
+                debug_log("init_model: int8 quantization unavailable")
+        # Reduce inference overhead where the runtime allows it: half
+        # precision on GPU, bfloat16 on CPU (halves memory bandwidth for
+        # the attention matmuls), then a compiled forward pass. Any
+        # failure leaves the eager FP32 model in place.
+        try:
+            import torch
+            if torch.cuda.is_available():
+                # bf16 keeps fp32's exponent range (no overflow in the
+                # attention softmax) and hits tensor cores on Ampere+;
+                # fall back to fp16 on older GPUs.
+                try:
+                    bf16_ok = torch.cuda.is_bf16_supported()
+                except Exception:
+                    bf16_ok = False
+                _model = (_model.to(torch.bfloat16) if bf16_ok else _model.half()).cuda()
+            elif not quantized:
+                _model = _model.to(torch.bfloat16)
+        except Exception:
+            debug_log("init_model: precision conversion skipped")
+        try:
+            import torch
+            _model = torch.compile(_model, mode="reduce-overhead")
+        except Exception:
+            debug_log("init_model: torch.compile unavailable — keeping eager model")
         debug_log("init_model: model loaded successfully")
         return True
     except Exception as e:
@@ -363,23 +594,32 @@ def _truncate_prompt_tokens(input_ids, max_tokens: int):
             pass
     return input_ids
 
-def generate_ml_fortune(user_profile: Dict[str, Any], max_new_tokens: int = MAX_NEW_TOKENS) -> str:
+def generate_ml_fortune(user_profile: Dict[str, Any], max_new_tokens: int = MAX_NEW_TOKENS,
+                        features: Optional[Dict[str, str]] = None) -> str:
     """
     Generate a fortune using the transformer model.
     Raises on failure so caller can fallback to rule-based.
+
+    `features` optionally carries precomputed zodiac/element/tone/dominant
+    from generate_fortune so they aren't derived twice per request.
     """
     if not init_model():
         raise RuntimeError("Model not available (transformers missing or init failed)")
 
     name = user_profile.get("name", "Wanderer")
     birth = user_profile.get("birthdate", "1900-01-01")
-    zodiac, element = analyze_zodiac(birth)
     # Build profile snippet: include quiz and known keys
     profile_clipped = {k: v for k, v in (user_profile.get("quiz") or user_profile).items() if k not in ("name", "birthdate")}
-    tone, dominant = compute_personality_signature(profile_clipped)
+    if features:
+        zodiac = features["zodiac"]
+        element = features["element"]
+        tone = features["tone"]
+        dominant = features["dominant"]
+    else:
+        zodiac, element = analyze_zodiac(birth)
+        tone, dominant = compute_personality_signature(profile_clipped)
     tone = temporal_tone_adjust(tone)
-    memory = load_memory()
-    history = memory.get(name, [])
+    history = get_user_history(name)
     history_text = "\n".join([h.get("fortune", "") for h in history[-5:]]) if history else ""
 
     prompt = (
@@ -404,19 +644,28 @@ def generate_ml_fortune(user_profile: Dict[str, Any], max_new_tokens: int = MAX_
         if hasattr(attention_mask, "__class__") and hasattr(attention_mask, "shape"):
             attention_mask = attention_mask[:, -input_ids.shape[-1]:]
 
-        # Model generate
-        outputs = _model.generate(
-            input_ids=input_ids,
-            attention_mask=attention_mask,
-            pad_token_id=_tokenizer.eos_token_id,
-            max_new_tokens=max_new_tokens,
-            do_sample=True,
-            temperature=0.85,
-            top_k=50,
-            top_p=0.92,
-            num_return_sequences=1,
-            eos_token_id=_tokenizer.eos_token_id
-        )
+        # Model generate — inference_mode skips autograd tracking entirely,
+        # and use_cache keeps the KV cache on (explicitly) between steps.
+        try:
+            import torch
+            inference_ctx = torch.inference_mode()
+        except Exception:
+            import contextlib
+            inference_ctx = contextlib.nullcontext()
+        with inference_ctx:
+            outputs = _model.generate(
+                input_ids=input_ids,
+                attention_mask=attention_mask,
+                pad_token_id=_tokenizer.eos_token_id,
+                max_new_tokens=max_new_tokens,
+                do_sample=True,
+                temperature=0.85,
+                top_k=50,
+                top_p=0.92,
+                num_return_sequences=1,
+                eos_token_id=_tokenizer.eos_token_id,
+                use_cache=True
+            )
 
         raw = _tokenizer.decode(outputs[0], skip_special_tokens=True)
         # Attempt to extract the portion after the prompt
@@ -439,46 +688,109 @@ def generate_ml_fortune(user_profile: Dict[str, Any], max_new_tokens: int = MAX_
 def json_snippet(d: Dict[str, Any], maxlen: int = 240) -> str:
     """Serialize a dict to JSON and truncate to maxlen characters sensibly."""
     try:
-        s = json.dumps(d, ensure_ascii=False)
-        if len(s) > maxlen:
-            # try to cut at a comma boundary
-            return s[:maxlen].rsplit(",", 1)[0] + "..."
-        return s
+        s = _dumps_compact(d)
+        if len(s) <= maxlen:
+            return s
+        # Cut at the last comma before the cap — rfind with a bound scans
+        # once, without the slice + rsplit allocations.
+        cut = s.rfind(",", 0, maxlen)
+        return (s[:cut] if cut != -1 else s[:maxlen]) + "..."
     except Exception:
         return "{}"
 
+# Sentence terminators, compiled once; the capture group keeps each
+# terminator in the split output so it can be re-attached.
+_SENT_RE = re.compile(r"([.?!])")
+
+# Known malformed-output markers; the alternation regex scans the text in
+# one pass instead of one `in` scan per marker.
+BAD_MARKERS = (
+    "unknown (element: void)",
+    "fortune: unknown (element: void)",
+    "the mirror is silent",
+)
+_BAD_RE = re.compile("|".join(map(re.escape, BAD_MARKERS)))
+
+def _is_valid_fortune(text: Optional[str]) -> bool:
+    """Validate generated fortune text: long enough, no junk markers,
+    not degenerately repetitive."""
+    if not text or not isinstance(text, str):
+        return False
+    t = text.strip()
+    if len(t) < 10:
+        return False
+    if _BAD_RE.search(t.lower()):
+        return False
+    # Detect repetitive patterns (e.g., "moon, moon, moon...")
+    bad = _repetitive_word(t)
+    if bad:
+        debug_log("_is_valid_fortune: detected repetitive pattern:", bad)
+        return False
+    return True
+
+def _repetitive_word(text: str, threshold: float = 0.6) -> Optional[str]:
+    """Return the word exceeding `threshold` of the word count, else None.
+
+    Shared junk detector for clean_generated_text and _is_valid_fortune.
+    Single accumulate pass with an early exit the moment the threshold is
+    crossed — no full Counter plus separate max() walks.
+    """
+    words = text.split()
+    n = len(words)
+    if n <= 5:
+        return None
+    thresh = int(n * threshold)
+    counts = {}
+    for w in words:
+        c = counts[w] = counts.get(w, 0) + 1
+        if c > thresh:
+            return w
+    return None
+
 def clean_generated_text(text: str) -> str:
     """Trim and heuristically shorten generated text (cap sentences). Also reject repetitive junk."""
     t = (text or "").strip()
     if not t:
         return t
-    
+
     # Check for repetitive patterns early
-    words = t.split()
-    if len(words) > 5:
-        word_counts = Counter(words)
-        most_common_count = max(word_counts.values()) if word_counts else 0
-        # If any word appears in >60% of text, it's junk
-        if most_common_count > len(words) * 0.6:
-            debug_log(f"clean_generated_text: rejecting repetitive text (word '{max(word_counts, key=word_counts.get)}' appears too often)")
-            return ""  # Return empty string to signal invalid
+    bad = _repetitive_word(t)
+    if bad:
+        debug_log("clean_generated_text: rejecting repetitive text:", bad)
+        return ""  # Return empty string to signal invalid
     
-    # Prefer first two sentences
-    for sep in (".", "?", "!"):
-        if sep in t:
-            parts = [p.strip() for p in t.split(sep) if p.strip()]
-            if len(parts) >= 2:
-                return (parts[0] + sep + " " + parts[1] + sep).strip()
-            else:
-                # only one sentence — return it
-                return (parts[0] + sep).strip()
+    # Prefer first two sentences — one regex pass over the text instead of
+    # a full str.split per terminator character.
+    parts = _SENT_RE.split(t, maxsplit=2)
+    if len(parts) >= 4:
+        first, second = parts[0].strip(), parts[2].strip()
+        if first and second:
+            return first + parts[1] + " " + second + parts[3]
+        if first:
+            return first + parts[1]
+        if second:
+            return second + parts[3]
+    elif len(parts) >= 2:
+        # One terminator: anything after it is an unterminated trailing
+        # sentence (common when max_new_tokens cuts generation mid-way) —
+        # keep it as the second sentence, closed with the same terminator.
+        first = parts[0].strip()
+        tail = parts[2].strip() if len(parts) > 2 else ""
+        if first and tail:
+            return first + parts[1] + " " + tail + parts[1]
+        if first:
+            return first + parts[1]
+        if tail:
+            return tail + parts[1]
     # fallback to length cap
-    return t if len(t) <= 400 else (t[:400].rsplit(" ", 1)[0] + "...")
+    if len(t) <= 400:
+        return t
+    cut = t.rfind(" ", 0, 400)
+    return (t[:cut] if cut > 0 else t[:400]) + "..."
 
 def summarize_user_history(name: str) -> Dict[str, Any]:
     """Return analytics summary for a user's fortune history."""
-    mem = load_memory()
-    history = mem.get(name, [])
+    history = get_user_history(name)
     if not history:
         return {"count": 0, "most_common_tone": None, "most_common_theme": None, "recent": []}
     # analytics
@@ -503,13 +815,16 @@ def export_memory_csv(path: str) -> bool:
     """
     try:
         import csv
-        mem = load_memory()
-        with open(path, "w", newline='', encoding="utf-8") as fh:
+        # Stream straight from a cursor into writerows (no intermediate
+        # row lists) with a 1 MiB write buffer to cut syscalls.
+        cursor = _memory_conn().execute(
+            "SELECT name, timestamp, zodiac, tone, theme, fortune "
+            "FROM entries ORDER BY name, ts_epoch, rowid"
+        )
+        with open(path, "w", newline='', encoding="utf-8", buffering=1 << 20) as fh:
             writer = csv.writer(fh)
             writer.writerow(["name", "timestamp", "zodiac", "tone", "theme", "fortune"])
-            for name, hist in mem.items():
-                for h in hist:
-                    writer.writerow([name, h.get("timestamp"), h.get("zodiac"), h.get("tone"), h.get("theme"), h.get("fortune")])
+            writer.writerows(tuple(r) for r in cursor)
         debug_log("export_memory_csv: exported to", path)
         return True
     except Exception as e:
@@ -520,18 +835,11 @@ def export_memory_csv(path: str) -> bool:
 def purge_memory_older_than(days: int = 365) -> int:
     """Remove memory entries older than given days; returns number of deleted entries."""
     try:
-        mem = load_memory()
-        cutoff = datetime.now() - timedelta(days=days)
-        removed = 0
-        for name in list(mem.keys()):
-            hist = mem.get(name, [])
-            newhist = [h for h in hist if datetime.fromisoformat(h.get("timestamp")) >= cutoff]
-            removed += (len(hist) - len(newhist))
-            if newhist:
-                mem[name] = newhist
-            else:
-                del mem[name]
-        save_memory(mem)
+        cutoff_epoch = int((datetime.now() - timedelta(days=days)).timestamp())
+        conn = _memory_conn()
+        cur = conn.execute("DELETE FROM entries WHERE ts_epoch < ?", (cutoff_epoch,))
+        conn.commit()
+        removed = cur.rowcount if cur.rowcount and cur.rowcount > 0 else 0
         debug_log(f"purge_memory_older_than: removed {removed} entries older than {days} days")
         return removed
     except Exception as e:
@@ -543,19 +851,34 @@ def batch_generate_for_users(user_profiles: Dict[str, Dict[str, Any]], force_rul
     """
     Batch-generate fortunes for many users. Returns mapping name->fortune.
     This is useful for local testing or seeding a cache.
+
+    Users are processed concurrently in a thread pool — each generation is
+    independent, and the heavy parts (disk IO, torch inference) release
+    the GIL.
     """
-    results = {}
-    for name, profile in user_profiles.items():
+    def _one(name: str, profile: Dict[str, Any]) -> str:
         try:
             if force_rule_based:
                 zodiac, elem = analyze_zodiac(profile.get("birthdate", "1900-01-01"))
                 tone, dom = compute_personality_signature(profile.get("quiz") or {})
-                f = rule_based_fortune(name, zodiac, elem, tone, dom, get_user_history(name))
-            else:
-                f = generate_fortune(profile)
-            results[name] = f
+                return rule_based_fortune(name, zodiac, elem, tone, dom, get_user_history(name))
+            return generate_fortune(profile)
         except Exception as e:
-            results[name] = f"[error generating fortune: {e}]"
+            return f"[error generating fortune: {e}]"
+
+    if not user_profiles:
+        return {}
+    if len(user_profiles) == 1:
+        name, profile = next(iter(user_profiles.items()))
+        return {name: _one(name, profile)}
+
+    from concurrent.futures import ThreadPoolExecutor
+    results = {}
+    with ThreadPoolExecutor(max_workers=min(32, len(user_profiles))) as pool:
+        futures = {name: pool.submit(_one, name, profile)
+                   for name, profile in user_profiles.items()}
+        for name, fut in futures.items():
+            results[name] = fut.result()
     return results
 
 # ================================
@@ -571,40 +894,22 @@ def generate_fortune(user_data: Dict[str, Any]) -> str:
     try:
         # Normalize user_data shape: if top-level keys exist instead of 'quiz'
         profile = user_data.get("quiz") if isinstance(user_data.get("quiz"), dict) else user_data
+        # Compute the shared features once up front: both the ML prompt and
+        # the rule-based fallback need the same zodiac/tone/dominant values,
+        # so thread them through instead of recomputing per branch.
+        name = user_data.get("name", "Wanderer")
+        birth = user_data.get("birthdate", "1900-01-01")
+        zodiac, element = analyze_zodiac(birth)
+        profile_clipped = {k: v for k, v in (profile or {}).items() if k not in ("name", "birthdate")}
+        tone, dominant = compute_personality_signature(profile_clipped)
+        features = {"zodiac": zodiac, "element": element, "tone": tone, "dominant": dominant}
         # Attempt ML generation if possible
         if TRANSFORMERS_AVAILABLE:
             try:
                 debug_log("generate_fortune: attempting ML generation")
-                ml_gen = generate_ml_fortune(user_data)
+                ml_gen = generate_ml_fortune(user_data, features=features)
                 # Validate ML output: must be non-empty and not a known placeholder
-                def _is_valid(text: Optional[str]) -> bool:
-                    if not text or not isinstance(text, str):
-                        return False
-                    t = text.strip()
-                    if len(t) < 10:
-                        return False
-                    # common malformed outputs to avoid
-                    bad_markers = ["unknown (element: void)", "fortune: unknown (element: void)", "the mirror is silent"]
-                    low = t.lower()
-                    for b in bad_markers:
-                        if b in low:
-                            return False
-                    
-                    # Detect repetitive patterns (e.g., "moon, moon, moon..." or "Zodiac: southern, Zodiac: southern...")
-                    # Split by common separators and check for high repetition
-                    words = t.split()
-                    if len(words) > 5:
-                        # Count word frequency
-                        word_counts = Counter(words)
-                        # If any single word appears in >60% of the text, it's likely repetitive junk
-                        most_common_count = max(word_counts.values()) if word_counts else 0
-                        if most_common_count > len(words) * 0.6:
-                            debug_log(f"_is_valid: detected repetitive pattern (word '{max(word_counts, key=word_counts.get)}' appears {most_common_count}/{len(words)} times)")
-                            return False
-                    
-                    return True
-
-                if _is_valid(ml_gen):
+                if _is_valid_fortune(ml_gen):
                     debug_log("generate_fortune: ML generation succeeded and validated")
                     return ml_gen.strip()
                 else:
@@ -614,13 +919,8 @@ def generate_fortune(user_data: Dict[str, Any]) -> str:
                 print("[fortune_engine] ML generation error:", e)
                 debug_log(traceback.format_exc())
 
-        # Rule-based fallback
-        name = user_data.get("name", "Wanderer")
-        birth = user_data.get("birthdate", "1900-01-01")
-        zodiac, element = analyze_zodiac(birth)
-        profile_map = user_data.get("quiz") or (user_data if isinstance(user_data, dict) else {})
-        tone, dominant = compute_personality_signature(profile_map)
-        history = load_memory().get(name, [])
+        # Rule-based fallback — reuses the features computed above
+        history = get_user_history(name)
         rule = rule_based_fortune(name, zodiac, element, tone, dominant, history)
         # final sanity: ensure rule isn't a small placeholder
         if not rule or not isinstance(rule, str) or len(rule.strip()) < 20:
@@ -643,6 +943,14 @@ def generate_fortune(user_data: Dict[str, Any]) -> str:
 def get_user_history_alias(name: str) -> List[Dict[str, Any]]:
     return get_user_history(name)
 
+def clear_caches() -> None:
+    """Reset the memoization caches (debug helper for /debug/clear_caches)."""
+    try:
+        analyze_zodiac.cache_clear()
+    except Exception:
+        pass
+    _signature_from_items.cache_clear()
+
 # Expose some useful functions for main.py to call
 __all__ = [
     "generate_fortune",
@@ -658,7 +966,8 @@ __all__ = [
     "batch_generate_for_users",
     "compute_personality_signature",
     "analyze_zodiac",
-    "astrology_hint"
+    "astrology_hint",
+    "clear_caches"
 ]
 
 # ================================
@@ -11,15 +11,28 @@ Notes:
 - Assumes quiz_logic.QuizEngine exists (see your quiz_logic.py) and fortune_engine functions present.
 """
 
+import hmac
 import os
+import re
 import json
 import random
+import time
+import threading
 import traceback
+from collections import Counter, defaultdict
 from datetime import datetime
 from typing import Optional
 
-from fastapi import FastAPI, Request, Form, Query
-from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+from fastapi import BackgroundTasks, FastAPI, Request, Form, Query
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+# Serve JSON through orjson's C serializer when it is installed; the
+# rebind covers every JSONResponse use below and the app default.
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as JSONResponse  # noqa: F811
+except ImportError:
+    pass
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from starlette.middleware.sessions import SessionMiddleware
@@ -32,6 +45,14 @@ from astrology import analyze_zodiac, astrology_hint
 from database import DatabaseHandler
 from quiz_logic import QuizEngine, process_quiz
 
+# Optional functional helpers some deployments ship in quiz_logic.
+# Resolved once here so the /quizdata hot path branches on None instead of
+# paying a failing import (plus exception unwind) per request.
+try:
+    from quiz_logic import load_questions as _load_questions, randomize_questions as _randomize_questions
+except ImportError:
+    _load_questions = _randomize_questions = None
+
 # ============================================================
 # CONFIG
 # ============================================================
@@ -40,6 +61,9 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 STATIC_DIR = os.path.join(BASE_DIR, "static")
 QUESTION_FILE = os.path.join(BASE_DIR, "question.json")  # used as fallback if /static/data/question.json exists
+# Joined once here; quiz_page/get_quizdata used to rebuild this path (and
+# stat it) on every request that fell through to the disk fallback.
+FALLBACK_QUESTIONS_PATH = os.path.join(STATIC_DIR, "data", "question.json")
 SECRET_KEY = os.environ.get("MIRROR_SECRET_KEY", "supersecretmirrorkey")
 # Allow overriding host/port via environment for easier device testing and cloud deployment
 # Render.com and similar platforms set $PORT automatically
@@ -47,7 +71,7 @@ HOST = os.environ.get("MIRROR_HOST", "0.0.0.0")
 PORT = int(os.environ.get("PORT") or os.environ.get("MIRROR_PORT") or "8000")
 
 # FastAPI app + static + templates
-app = FastAPI(title="Mirror Mirror Backend", debug=False)
+app = FastAPI(title="Mirror Mirror Backend", debug=False, default_response_class=JSONResponse)
 app.add_middleware(SessionMiddleware, secret_key=SECRET_KEY)
 
 # CORS configuration: control via `ALLOWED_ORIGINS` (comma-separated) or
@@ -84,6 +108,19 @@ if not os.path.isdir(STATIC_DIR):
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 templates = Jinja2Templates(directory=TEMPLATES_DIR)
 
+# In production templates don't change under a running server, so skip the
+# per-render stat() and keep compiled templates across restarts via an
+# on-disk bytecode cache. Dev keeps auto-reload for fast iteration.
+if os.environ.get("MIRROR_ENV") == "production":
+    try:
+        import jinja2
+        templates.env.auto_reload = False
+        _jinja_cache_dir = os.path.join(BASE_DIR, ".jinja_cache")
+        os.makedirs(_jinja_cache_dir, exist_ok=True)
+        templates.env.bytecode_cache = jinja2.FileSystemBytecodeCache(directory=_jinja_cache_dir)
+    except Exception:
+        print(f"[main WARNING] jinja template cache setup failed: {traceback.format_exc()}")
+
 # Ensure templates dir exists
 if not os.path.isdir(TEMPLATES_DIR):
     print(f"[main WARNING] templates directory missing at expected path: {TEMPLATES_DIR}")
@@ -92,14 +129,16 @@ if not os.path.isdir(TEMPLATES_DIR):
 db = DatabaseHandler(os.path.join(BASE_DIR, "mirror.db"))
 quiz_engine = QuizEngine(QUESTION_FILE)
 
-# Expanded global analytics store
+# Expanded global analytics store — Counters give C-level increments and
+# the lock keeps updates consistent under concurrent requests.
 analytics_data = {
     "total_submissions": 0,
-    "names_counter": {},
-    "traits_counter": {},
-    "zodiac_counter": {},
+    "names_counter": Counter(),
+    "traits_counter": defaultdict(Counter),
+    "zodiac_counter": Counter(),
     "error_events": []
 }
+_ANALYTICS_LOCK = threading.Lock()
 
 # ============================================================
 # Logging helpers
@@ -139,41 +178,70 @@ def get_session_profile(request: Request) -> dict:
     return request.session.get("profile", {})
 
 def set_session_profile(request: Request, profile: dict):
-    request.session["profile"] = profile
-    if "session_start" not in request.session:
-        request.session["session_start"] = datetime.now().isoformat()
-    request.session["last_activity"] = datetime.now().isoformat()
-    request.session["submissions"] = request.session.get("submissions", 0) + 1
+    # One datetime.now() and one dict.update instead of four separate
+    # session writes; also invalidates any metrics cached on this request.
+    sess = request.session
+    now = datetime.now().isoformat()
+    sess.update({
+        "profile": profile,
+        "session_start": sess.get("session_start", now),
+        "last_activity": now,
+        "submissions": sess.get("submissions", 0) + 1
+    })
+    # (Starlette's State raises KeyError, not AttributeError, on delete.)
+    try:
+        del request.state._session_metrics
+    except KeyError:
+        pass
 
 def clear_session_profile(request: Request):
     for k in ["profile", "session_start", "last_activity", "submissions"]:
         request.session.pop(k, None)
 
 def get_session_metrics(request: Request) -> dict:
-    return {
+    # Computed at most once per request: later callers within the same
+    # request get the dict cached on request.state.
+    try:
+        return request.state._session_metrics
+    except AttributeError:
+        pass
+    metrics = {
         "session_start": request.session.get("session_start"),
         "last_activity": request.session.get("last_activity"),
         "submissions": request.session.get("submissions", 0)
     }
+    request.state._session_metrics = metrics
+    return metrics
 
 # ============================================================
 # General helpers
 # ============================================================
+# One C-level regex pass beats the per-character generator + join this
+# replaced; sanitize_name runs on every submit/history/fortune request.
+_NAME_RE = re.compile(r"[^A-Za-z0-9 _-]+")
+
 def sanitize_name(name: str) -> str:
-    return "".join(c for c in (name or "") if c.isalnum() or c in " _-").strip() or "Wanderer"
+    return _NAME_RE.sub("", name or "").strip() or "Wanderer"
+
+# Timestamps are second-granular, so cache the formatted string until the
+# clock ticks over instead of re-running strftime on every call.
+_TS_CACHE = [0, ""]
 
 def format_timestamp() -> str:
-    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    s = int(time.time())
+    if s != _TS_CACHE[0]:
+        _TS_CACHE[0] = s
+        _TS_CACHE[1] = datetime.fromtimestamp(s).strftime("%Y-%m-%d %H:%M:%S")
+    return _TS_CACHE[1]
 
 def update_analytics(name: str, profile: Optional[dict] = None):
-    analytics_data["total_submissions"] += 1
-    analytics_data["names_counter"].setdefault(name, 0)
-    analytics_data["names_counter"][name] += 1
-    if profile:
-        for k, v in profile.items():
-            analytics_data["traits_counter"].setdefault(k, {})
-            analytics_data["traits_counter"][k].setdefault(str(v), 0)
-            analytics_data["traits_counter"][k][str(v)] += 1
+    with _ANALYTICS_LOCK:
+        analytics_data["total_submissions"] += 1
+        analytics_data["names_counter"][name] += 1
+        if profile:
+            traits = analytics_data["traits_counter"]
+            for k, v in profile.items():
+                traits[k][str(v)] += 1
 
 def compute_quiz_summary(profile: dict) -> dict:
     if not profile:
@@ -199,12 +267,24 @@ def compute_quiz_summary(profile: dict) -> dict:
 # ============================================================
 # ML pipeline prep
 # ============================================================
+def _trait_int(v):
+    """Coerce a quiz trait value to int, defaulting to 0."""
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        return 0
+
 def ml_feature_vector(name, birthdate, profile):
     """Transforms user data into a structured ML-ready vector."""
     zodiac, element = analyze_zodiac(birthdate)
-    analytics_data["zodiac_counter"].setdefault(zodiac, 0)
-    analytics_data["zodiac_counter"][zodiac] += 1
-    numeric_traits = {k: int(v) if str(v).isdigit() else 0 for k, v in (profile or {}).items()}
+    with _ANALYTICS_LOCK:
+        analytics_data["zodiac_counter"][zodiac] += 1
+    # Hot numeric loop for batch seeding: quiz values are already ints in
+    # practice, so take that branch without the str()/isdigit round-trip.
+    numeric_traits = {
+        k: v if type(v) is int else _trait_int(v)
+        for k, v in (profile or {}).items()
+    }
     return {
         "name_len": len(name or ""),
         "birth_year": int(birthdate.split("-")[0]) if birthdate and "-" in birthdate else 1900,
@@ -213,40 +293,73 @@ def ml_feature_vector(name, birthdate, profile):
         "traits": numeric_traits
     }
 
+# Results are stored newline-delimited: appends are O(1) in file size
+# instead of read-all/rewrite-all per submission, and partial lines from
+# a crash can't corrupt earlier records.
+ML_TRAINING_FILE = os.path.join(BASE_DIR, "ml_training.ndjson")
+QUIZ_RESULTS_FILE = os.path.join(BASE_DIR, "quiz_results.ndjson")
+
+# JSON codec for the NDJSON read/write paths: orjson when installed
+# (C-speed, UTF-8 by default), stdlib otherwise — same optional-dependency
+# guard as fortune_engine.
+try:
+    import orjson
+
+    def _json_line(obj) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_line(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+    _json_loads = json.loads
+
+def _migrate_json_list_to_ndjson(old_path: str, new_path: str):
+    """One-shot migration of a legacy list-JSON file to newline-delimited JSON."""
+    try:
+        if os.path.exists(new_path) or not os.path.exists(old_path):
+            return
+        with open(old_path, "r", encoding="utf-8") as fh:
+            data = json.load(fh)
+        if not isinstance(data, list):
+            return
+        tmp = new_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            for rec in data:
+                fh.write(_json_line(rec) + "\n")
+        os.replace(tmp, new_path)
+        log_debug(f"Migrated {old_path} -> {new_path}")
+    except Exception:
+        log_error(f"ndjson migration failed for {old_path}: {traceback.format_exc()}")
+
+def _read_ndjson(path: str) -> list:
+    """Read a newline-delimited JSON file, skipping blank/corrupt lines."""
+    records = []
+    with open(path, "r", encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(_json_loads(line))
+            except Exception:
+                continue
+    return records
+
 def save_ml_training_record(payload):
-    """Appends a training datapoint to ml_training.json for future ML model."""
-    out_file = os.path.join(BASE_DIR, "ml_training.json")
+    """Appends a training datapoint to ml_training.ndjson for future ML model."""
     try:
-        data = []
-        if os.path.exists(out_file):
-            with open(out_file, "r", encoding="utf-8") as fh:
-                try:
-                    data = json.load(fh)
-                except Exception:
-                    data = []
-        data.append(payload)
-        with open(out_file, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with open(ML_TRAINING_FILE, "a", encoding="utf-8") as fh:
+            fh.write(_json_line(payload) + "\n")
     except Exception as e:
         log_error(f"save_ml_training_record failed: {e}")
 
 def save_quiz_result(payload: dict):
-    """Append quiz result to `quiz_results.json` for easy bulk export and offline analysis."""
-    out_file = os.path.join(BASE_DIR, "quiz_results.json")
+    """Append quiz result to `quiz_results.ndjson` for easy bulk export and offline analysis."""
     try:
-        data = []
-        if os.path.exists(out_file):
-            with open(out_file, "r", encoding="utf-8") as fh:
-                try:
-                    data = json.load(fh)
-                except Exception:
-                    data = []
-        data.append(payload)
-        # atomic write
-        tmp = out_file + ".tmp"
-        with open(tmp, "w", encoding="utf-8") as fh:
-            json.dump(data, fh, indent=2, ensure_ascii=False)
-        os.replace(tmp, out_file)
+        with open(QUIZ_RESULTS_FILE, "a", encoding="utf-8") as fh:
+            fh.write(_json_line(payload) + "\n")
     except Exception as e:
         log_error(f"save_quiz_result failed: {e}")
 
@@ -254,11 +367,22 @@ def save_quiz_result(payload: dict):
 # ROUTES — pages & data endpoints
 # ============================================================
 
-# Landing page — use index.html (keeps UI consistent)
+# Landing page — use index.html (keeps UI consistent).
+# The page is a static shell, so render it once and reuse the HTML. The
+# cache is keyed on base_url because the template's url_for links embed
+# the request host; the size cap guards against Host-header churn.
+_LANDING_CACHE = {}
+
 @app.get("/", response_class=HTMLResponse)
 async def landing(request: Request):
     try:
-        return templates.TemplateResponse("index.html", {"request": request})
+        key = str(request.base_url)
+        html = _LANDING_CACHE.get(key)
+        if html is None:
+            html = templates.get_template("index.html").render({"request": request})
+            if len(_LANDING_CACHE) < 16:
+                _LANDING_CACHE[key] = html
+        return HTMLResponse(html)
     except Exception:
         log_error(f"landing() failure: {traceback.format_exc()}")
         # Fallback simple HTML
@@ -273,62 +397,100 @@ async def quiz_page(request: Request):
         try:
             questions = quiz_engine.get_randomized_questions(6)
         except Exception:
-            # Attempt to read a static fallback question file inside static/data
-            fallback_path = os.path.join(STATIC_DIR, "data", "question.json")
-            if os.path.exists(fallback_path):
-                try:
-                    with open(fallback_path, "r", encoding="utf-8") as fh:
-                        questions = json.load(fh)
-                except Exception:
-                    questions = []
+            # Serve the static fallback questions preloaded at startup —
+            # no disk I/O on this path any more.
+            questions = _FALLBACK_QUESTIONS or []
         return templates.TemplateResponse("quiz.html", {"request": request, "questions": questions, "timestamp": format_timestamp()})
     except Exception:
         log_error(f"quiz_page() failure: {traceback.format_exc()}")
         return HTMLResponse("<h1>Error loading quiz page</h1>", status_code=500)
 
+# Per-question pre-serialized JSON blobs for /quizdata. Sampling and
+# joining bytes per request keeps the randomized selection while skipping
+# the per-request dict serialization and any disk fallback. Rebuilt at
+# startup and whenever the question bank changes.
+_QUIZDATA_CACHE = {"blobs": [], "version": 0}
+_QUIZDATA_LOCK = threading.Lock()
+
+# Parsed static fallback question file, loaded once at startup so the
+# fallback branches serve from memory instead of re-reading disk per
+# request. None means the file does not exist; [] means it was unreadable.
+_FALLBACK_QUESTIONS = None
+
+def load_fallback_questions():
+    global _FALLBACK_QUESTIONS
+    try:
+        with open(FALLBACK_QUESTIONS_PATH, "r", encoding="utf-8") as fh:
+            data = _json_loads(fh.read())
+        if isinstance(data, dict) and "questions" in data:
+            _FALLBACK_QUESTIONS = data["questions"]
+        elif isinstance(data, list):
+            _FALLBACK_QUESTIONS = data
+        else:
+            _FALLBACK_QUESTIONS = []
+    except FileNotFoundError:
+        _FALLBACK_QUESTIONS = None
+    except Exception as e:
+        log_error(f"Failed reading fallback question file: {e}")
+        _FALLBACK_QUESTIONS = []
+
+def rebuild_quizdata_cache():
+    try:
+        bank = getattr(quiz_engine, "question_bank", None) or []
+        blobs = [_json_line(q).encode("utf-8") for q in bank]
+        with _QUIZDATA_LOCK:
+            _QUIZDATA_CACHE["blobs"] = blobs
+            _QUIZDATA_CACHE["version"] += 1
+        log_debug(f"quizdata cache rebuilt: {len(blobs)} questions")
+    except Exception:
+        log_error(f"rebuild_quizdata_cache failed: {traceback.format_exc()}")
+
 # JSON endpoint for client to request questions (used by quiz.js)
 @app.get("/quizdata")
 def get_quizdata(request: Request):
     try:
+        # Hot path: serve from the pre-serialized cache unless the session
+        # carries a profile (the personalized path appends follow-ups).
+        try:
+            if not request.session.get('profile'):
+                with _QUIZDATA_LOCK:
+                    blobs = _QUIZDATA_CACHE["blobs"]
+                if blobs:
+                    picked = random.sample(blobs, min(6, len(blobs)))
+                    body = b'{"questions":[' + b",".join(picked) + b']}'
+                    return Response(content=body, media_type="application/json")
+        except Exception:
+            log_error(f"/quizdata cache path failed: {traceback.format_exc()}")
+
         # Preferred: use quiz_logic helpers if they exist
+        if _load_questions is not None:
+            try:
+                all_questions = _load_questions()
+                selected = _randomize_questions(all_questions, 6)
+                return {"questions": selected}
+            except Exception:
+                log_error(f"/quizdata functional helper path failed: {traceback.format_exc()}")
+        # Fallback: try QuizEngine methods
         try:
-            from quiz_logic import load_questions, randomize_questions
-            all_questions = load_questions()
-            selected = randomize_questions(all_questions, 6)
-            return {"questions": selected}
+            if hasattr(quiz_engine, "get_randomized_questions"):
+                selected = quiz_engine.get_randomized_questions(6)
+                return {"questions": selected}
         except Exception:
-            # Fallback: try QuizEngine methods
+            pass
+
+        # Fallback: static data file, preloaded at startup (None when the
+        # file does not exist on disk).
+        base_questions = _FALLBACK_QUESTIONS
+        if base_questions is not None:
+            # If session contains profile data, append generated followups
             try:
-                if hasattr(quiz_engine, "get_randomized_questions"):
-                    selected = quiz_engine.get_randomized_questions(6)
-                    return {"questions": selected}
+                profile = request.session.get('profile', {})
+                if profile and hasattr(quiz_engine, 'generate_followup_questions'):
+                    followups = quiz_engine.generate_followup_questions(profile, n=3)
+                    base_questions = (base_questions or []) + followups
             except Exception:
                 pass
-
-            # Fallback: static data file
-            fallback_path = os.path.join(STATIC_DIR, "data", "question.json")
-            if os.path.exists(fallback_path):
-                try:
-                    with open(fallback_path, "r", encoding="utf-8") as fh:
-                        data = json.load(fh)
-                        if isinstance(data, dict) and "questions" in data:
-                            base_questions = data["questions"]
-                        elif isinstance(data, list):
-                            base_questions = data
-                        else:
-                            base_questions = []
-                except Exception as e:
-                    log_error(f"Failed reading fallback question file: {e}")
-                    base_questions = []
-                # If session contains profile data, append generated followups
-                try:
-                    profile = request.session.get('profile', {})
-                    if profile and hasattr(quiz_engine, 'generate_followup_questions'):
-                        followups = quiz_engine.generate_followup_questions(profile, n=3)
-                        base_questions = (base_questions or []) + followups
-                except Exception:
-                    pass
-                return {"questions": base_questions}
+            return {"questions": base_questions}
 
         # If we reach here no source found
         log_error("/quizdata: no question source available")
@@ -337,9 +499,19 @@ def get_quizdata(request: Request):
         log_error(f"/quizdata unexpected error: {exc}")
         return JSONResponse({"questions": []}, status_code=500)
 
+# Canonical quiz trait names accepted as bare form fields.
+_CANONICAL_TRAITS = frozenset({"mood", "focus", "trust", "creativity", "patience", "empathy"})
+
+def _persist_submission_db(name, birthdate, profile, fortune_text):
+    """Background write of a submission to the DB (defensive, logged)."""
+    try:
+        db.save_user_result(name, birthdate, profile, fortune_text)
+    except Exception as e:
+        log_error(f"db.save_user_result failed: {e}")
+
 # Submit quiz form — receives JSON data (from quiz.js) or form-encoded (legacy)
 @app.post("/submit", response_class=JSONResponse)
-async def submit_quiz(request: Request):
+async def submit_quiz(request: Request, background_tasks: BackgroundTasks):
     try:
         # Determine content type and parse accordingly
         content_type = request.headers.get("content-type", "")
@@ -356,23 +528,17 @@ async def submit_quiz(request: Request):
             name = sanitize_name(form.get("name", "Wanderer"))
             birthdate = form.get("birthdate", "1900-01-01")
             
-            # extract quiz answers
+            # extract quiz answers: q_-prefixed keys and canonical traits
+            # map straight in; anything else keeps the numeric-slider
+            # coercion. str.isdigit can't raise, so no try/except needed.
             profile = {}
             for key, val in form.items():
-                # Accept q_ prefixed keys OR the canonical trait names
                 if key.startswith("q_"):
                     profile[key[2:]] = val
-                elif key in ["mood", "focus", "trust", "creativity", "patience", "empathy"]:
+                elif key in _CANONICAL_TRAITS:
                     profile[key] = val
                 else:
-                    # also accept numeric sliders (range inputs)
-                    try:
-                        if str(val).isdigit():
-                            profile[key] = int(val)
-                        else:
-                            profile[key] = val
-                    except Exception:
-                        profile[key] = val
+                    profile[key] = int(val) if isinstance(val, str) and val.isdigit() else val
 
         # session + analytics
         set_session_profile(request, profile)
@@ -382,27 +548,20 @@ async def submit_quiz(request: Request):
         user_data = {"name": name, "birthdate": birthdate, "quiz": profile}
         fortune_text = generate_fortune(user_data)
 
-        # Save to DB (defensive call - DatabaseHandler should implement save_user_result)
-        try:
-            db.save_user_result(name, birthdate, profile, fortune_text)
-        except Exception as e:
-            log_error(f"db.save_user_result failed: {e}")
-
-        # persist ML record
+        # Persistence runs after the response is flushed: the client only
+        # needs the fortune, so the DB insert and the two NDJSON appends
+        # move off the critical path. Each task already swallows and logs
+        # its own failures, so a bad write can't surface as a 500 here.
+        background_tasks.add_task(_persist_submission_db, name, birthdate, profile, fortune_text)
         training_record = ml_feature_vector(name, birthdate, profile)
-        save_ml_training_record(training_record)
-
-        # persist to single JSON results file for bulk export/analysis
-        try:
-            save_quiz_result({
-                "timestamp": format_timestamp(),
-                "name": name,
-                "birthdate": birthdate,
-                "profile": profile,
-                "fortune": fortune_text
-            })
-        except Exception as e:
-            log_error(f"save_quiz_result call failed: {e}")
+        background_tasks.add_task(save_ml_training_record, training_record)
+        background_tasks.add_task(save_quiz_result, {
+            "timestamp": format_timestamp(),
+            "name": name,
+            "birthdate": birthdate,
+            "profile": profile,
+            "fortune": fortune_text
+        })
 
         # Compose hints and include astrology data
         hints = compute_quiz_summary(profile)
@@ -412,13 +571,17 @@ async def submit_quiz(request: Request):
         # store small session-level last fortune for quick rendering
         request.session["last_fortune"] = fortune_text
 
-        return JSONResponse({
+        # Serialize once through the module codec and hand Response the raw
+        # bytes — JSONResponse would re-walk the payload through its own
+        # encoder a second time.
+        body = _json_line({
             "fortune": fortune_text,
             "profile": profile,
             "hints": hints,
             "session_metrics": get_session_metrics(request),
             "timestamp": format_timestamp()
-        })
+        }).encode("utf-8")
+        return Response(content=body, media_type="application/json")
     except Exception:
         log_error(f"submit_quiz() crash: {traceback.format_exc()}")
         return JSONResponse({"error": "Failed to process quiz."}, status_code=500)
@@ -440,22 +603,23 @@ async def fortune_page(request: Request, name: Optional[str] = None, fortune: Op
             txt = sess.get("last_fortune", "")
 
         if (not txt) and name:
+            # One guarded call around the real I/O point; the entry walk
+            # below is plain dict access and cannot raise, so the old
+            # nested try/excepts were exception-as-control-flow for
+            # nothing and masked real errors.
             try:
-                history = get_user_history(sanitize_name(name))
-                if history:
-                    # fortune_engine.get_user_history returns list of entries (newest-first or oldest-first depending impl)
-                    # use last element if stored oldest-first; try newest-first first
-                    if isinstance(history, list) and history:
-                        # pick newest if entry has timestamp
-                        try:
-                            # assume entries have 'timestamp' and 'fortune'
-                            latest = sorted(history, key=lambda e: e.get("timestamp", ""), reverse=True)[0]
-                            txt = latest.get("fortune", "")
-                        except Exception:
-                            # fallback to last entry
-                            txt = history[-1].get("fortune", "") if history[-1].get("fortune") else ""
+                history = get_user_history(sanitize_name(name)) or []
             except Exception:
                 log_debug(f"fortune_page: get_user_history failed for {name}")
+                history = []
+            if history:
+                if all(isinstance(e, dict) for e in history):
+                    # max() finds the newest entry in one pass — no
+                    # O(n log n) sort or intermediate list
+                    latest = max(history, key=lambda e: e.get("timestamp", ""))
+                else:
+                    latest = history[-1]
+                txt = latest.get("fortune", "") if isinstance(latest, dict) else ""
 
         if not txt:
             txt = "The mirror is quiet right now. Stand before it and speak your truth."
@@ -473,7 +637,7 @@ async def fortune_data(name: Optional[str] = None):
             hist = get_user_history(sanitize_name(name))
             if hist:
                 # return newest entry if available
-                latest = sorted(hist, key=lambda e: e.get("timestamp", ""), reverse=True)[0]
+                latest = max(hist, key=lambda e: e.get("timestamp", ""))
                 return JSONResponse({"fortune": latest.get("fortune", "")})
         # default sample fortune (generator expects user_data; we pass minimal)
         sample = generate_fortune({"name": "Wanderer", "birthdate": "1900-01-01", "quiz": {}})
@@ -486,12 +650,34 @@ async def fortune_data(name: Optional[str] = None):
 # User history / analytics / debug endpoints
 # ============================================================
 
+# Tiny TTL cache for GETs that are pure functions of their path parameter.
+# Values are pre-serialized bodies, so hits skip recompute and JSON
+# serialization; the size cap bounds memory under key churn.
+_ROUTE_CACHE = {}
+_ROUTE_CACHE_MAX = 4096
+
+def _route_cache_get(key):
+    hit = _ROUTE_CACHE.get(key)
+    if hit is not None and hit[0] > time.monotonic():
+        return hit[1]
+    return None
+
+def _route_cache_put(key, body: bytes, ttl: float):
+    if len(_ROUTE_CACHE) >= _ROUTE_CACHE_MAX:
+        _ROUTE_CACHE.clear()
+    _ROUTE_CACHE[key] = (time.monotonic() + ttl, body)
+
 @app.get("/history/{username}", response_class=JSONResponse)
 async def user_history(username: str):
     try:
         uns = sanitize_name(username)
-        history = db.get_user_history(uns)
-        return JSONResponse({"history": history})
+        key = ("history", uns)
+        body = _route_cache_get(key)
+        if body is None:
+            history = db.get_user_history(uns)
+            body = _json_line({"history": history}).encode("utf-8")
+            _route_cache_put(key, body, ttl=30.0)
+        return Response(content=body, media_type="application/json")
     except Exception:
         log_error(f"user_history() crash: {traceback.format_exc()}")
         return JSONResponse({"history": []})
@@ -499,10 +685,12 @@ async def user_history(username: str):
 @app.get("/analytics", response_class=JSONResponse)
 async def analytics():
     try:
-        top_names = sorted(analytics_data["names_counter"].items(), key=lambda x: x[1], reverse=True)
+        # Counter.most_common uses a heap: O(n log 10) for the top ten
+        # instead of sorting every distinct name.
+        top_names = analytics_data["names_counter"].most_common(10)
         return JSONResponse({
             "total_submissions": analytics_data["total_submissions"],
-            "top_names": top_names[:10],
+            "top_names": top_names,
             "zodiac_distribution": analytics_data["zodiac_counter"]
         })
     except Exception:
@@ -510,18 +698,39 @@ async def analytics():
         return JSONResponse({"error": "analytics failed"}, status_code=500)
 
 
-@app.get("/admin/download_results", response_class=JSONResponse)
+def _stream_results_array(fh):
+    """Yield the NDJSON results file as one {"results": [...]} JSON body.
+
+    Lines pass through as raw bytes — no parse/re-serialize round trip —
+    so server memory stays flat no matter how large the file grows.
+    """
+    try:
+        yield b'{"results":['
+        first = True
+        for line in fh:
+            line = line.strip()
+            if not line.startswith(b"{"):
+                continue
+            if not first:
+                yield b","
+            first = False
+            yield line
+        yield b"]}"
+    finally:
+        fh.close()
+
+@app.get("/admin/download_results")
 async def download_results(token: Optional[str] = Query(None)):
-    """Return the consolidated `quiz_results.json`. Requires `token` query param matching SECRET_KEY."""
+    """Stream the consolidated quiz results. Requires `token` query param matching SECRET_KEY."""
     try:
-        if token != SECRET_KEY:
+        # compare_digest: constant-time token check (no timing oracle)
+        if not token or not hmac.compare_digest(token, SECRET_KEY):
             return JSONResponse({"error": "unauthorized"}, status_code=403)
-        out_file = os.path.join(BASE_DIR, "quiz_results.json")
-        if not os.path.exists(out_file):
+        try:
+            fh = open(QUIZ_RESULTS_FILE, "rb")
+        except FileNotFoundError:
             return JSONResponse({"error": "no_results"}, status_code=404)
-        with open(out_file, "r", encoding="utf-8") as fh:
-            data = json.load(fh)
-        return JSONResponse({"results": data})
+        return StreamingResponse(_stream_results_array(fh), media_type="application/json")
     except Exception:
         log_error(f"download_results() crash: {traceback.format_exc()}")
         return JSONResponse({"error": "failed"}, status_code=500)
@@ -537,14 +746,31 @@ async def debug_session(request: Request):
 async def debug_system():
     return JSONResponse(dump_debug_state())
 
+@app.get("/debug/clear_caches", response_class=JSONResponse)
+async def clear_caches():
+    try:
+        from fortune_engine import clear_caches as fe_clear_caches
+        fe_clear_caches()
+        return JSONResponse({"status": "cleared"})
+    except Exception:
+        log_error(f"clear_caches() crash: {traceback.format_exc()}")
+        return JSONResponse({"status": "failed"}, status_code=500)
+
 # ============================================================
 # Astrology helper
 # ============================================================
 @app.get("/astrology/{birthdate}", response_class=JSONResponse)
 async def get_astrology(birthdate: str):
     try:
-        zodiac, element = analyze_zodiac(birthdate)
-        return JSONResponse({"zodiac": zodiac, "element": element, "hint": astrology_hint(element)})
+        key = ("astrology", birthdate)
+        body = _route_cache_get(key)
+        if body is None:
+            zodiac, element = analyze_zodiac(birthdate)
+            body = _json_line(
+                {"zodiac": zodiac, "element": element, "hint": astrology_hint(element)}
+            ).encode("utf-8")
+            _route_cache_put(key, body, ttl=3600.0)
+        return Response(content=body, media_type="application/json")
     except Exception:
         log_error(f"get_astrology() crash: {traceback.format_exc()}")
         return JSONResponse({"zodiac": "Unknown", "element": "Void", "hint": ""})
@@ -564,6 +790,7 @@ async def add_question(request: Request):
         payload = await request.json()
         quiz_engine.add_question(payload)
         quiz_engine.save_question_bank()
+        rebuild_quizdata_cache()
         return JSONResponse({"status": "ok", "added": payload})
     except Exception:
         log_error(f"add_question() crash: {traceback.format_exc()}")
@@ -573,6 +800,7 @@ async def add_question(request: Request):
 async def reload_questions():
     try:
         quiz_engine.load_question_bank()
+        rebuild_quizdata_cache()
         return JSONResponse({"status": "reloaded", "count": quiz_engine.question_count})
     except Exception:
         log_error(f"reload_questions() crash: {traceback.format_exc()}")
@@ -584,6 +812,9 @@ async def reload_questions():
 @app.on_event("startup")
 async def startup_event():
     log_debug("Mirror Mirror backend starting...")
+    # One-shot conversion of legacy list-JSON result files
+    _migrate_json_list_to_ndjson(os.path.join(BASE_DIR, "ml_training.json"), ML_TRAINING_FILE)
+    _migrate_json_list_to_ndjson(os.path.join(BASE_DIR, "quiz_results.json"), QUIZ_RESULTS_FILE)
     # Defensive: try multiple DB init strategies
     try:
         if hasattr(db, "initialize_tables"):
@@ -601,12 +832,29 @@ async def startup_event():
         log_debug(f"Loaded question bank: {getattr(quiz_engine, 'question_count', 'unknown')} questions")
     except Exception:
         log_error(f"quiz_engine load failed: {traceback.format_exc()}")
+    rebuild_quizdata_cache()
+    load_fallback_questions()
+
+    # Warm the ML model off the request path: init_model is a no-op when
+    # transformers is missing or rule-based mode is forced, and loading in
+    # a daemon thread keeps the first /submit from eating the cold start.
+    try:
+        import fortune_engine
+        if getattr(fortune_engine, "TRANSFORMERS_AVAILABLE", False):
+            threading.Thread(target=fortune_engine.init_model, daemon=True).start()
+            log_debug("Model warmup thread started.")
+    except Exception:
+        log_error(f"model warmup failed: {traceback.format_exc()}")
 
     log_debug("Initialization complete.")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     log_debug("Mirror Mirror backend shutting down...")
+    try:
+        db.close()
+    except Exception:
+        log_error(f"db.close failed: {traceback.format_exc()}")
 
 # ============================================================
 # Error handlers (kept simple)
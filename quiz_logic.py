@@ -9,11 +9,54 @@
 # - Robust loading for multiple questions.json shapes
 # - Normalization to flat list, safe-save, debug output
 
+import logging
 import random
+import re
+from functools import lru_cache
 from typing import Dict, List, Any
 from datetime import datetime
 import json
 import os
+import tempfile
+import time
+
+# Module logger for persistence errors: unlike bare print(), the caller
+# controls the handler (and can make it async via QueueHandler), and
+# .exception() records the traceback instead of just str(e).
+_log = logging.getLogger(__name__)
+
+# JSON codec: orjson when installed (C-speed), stdlib otherwise — same
+# optional-dependency guard as fortune_engine and main.
+try:
+    import orjson
+
+    def _json_read(fh) -> Any:
+        return orjson.loads(fh.read())
+
+    def _json_write(fh, data: Any) -> None:
+        fh.write(orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8"))
+
+    def _json_line(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+    _json_loads = orjson.loads
+except ImportError:
+    def _json_read(fh) -> Any:
+        return json.load(fh)
+
+    def _json_write(fh, data: Any) -> None:
+        json.dump(data, fh, indent=2, ensure_ascii=False)
+
+    def _json_line(obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+    _json_loads = json.loads
+
+# Dedicated RNG instance: the module-level random functions all indirect
+# through a hidden global Random via bound-method lookup on every call;
+# a private instance skips that hop on the hot quiz paths. Not seeded —
+# same statistical behavior as before.
+_RNG = random.Random()
 
 # ---------------------
 # Utility helpers
@@ -25,18 +68,21 @@ def _debug(msg: str):
     except Exception:
         pass
 
-def _is_grouped_questions(obj: Any) -> bool:
-    """Detects grouped shape like { "emotion": ["q1", "q2"], "focus": ["q1","q2"] }"""
-    if not isinstance(obj, dict):
-        return False
-    for k, v in obj.items():
-        if not isinstance(v, list):
-            return False
-    return True
-
-def _is_enveloped_questions(obj: Any) -> bool:
-    """Detects envelope shape like { "questions": [ ... ] }"""
-    return isinstance(obj, dict) and "questions" in obj and isinstance(obj["questions"], list)
+def _detect_shape(raw: Any) -> str:
+    """Classify the question-file shape in O(1): 'flat' (list),
+    'enveloped' ({"questions": [...]}) or 'grouped' ({category: [...]}).
+
+    Replaces the old pair of predicates that each walked the whole dict;
+    a type check plus one key probe is enough since the grouped
+    normalizer already skips non-list values itself.
+    """
+    if isinstance(raw, list):
+        return "flat"
+    if isinstance(raw, dict):
+        if "questions" in raw:
+            return "enveloped" if isinstance(raw["questions"], list) else "unknown"
+        return "grouped"
+    return "unknown"
 
 def _normalize_grouped_to_list(grouped: Dict[str, List[str]]) -> List[Dict]:
     """Turn grouped format into flat list"""
@@ -109,9 +155,33 @@ class QuizEngine:
         self.question_file = question_file
         self.question_bank: List[Dict] = []
         self.question_count = 0
+        # Derived indexes, kept in sync by _rebuild_index/add_question so
+        # id assignment and category lookups never rescan the whole bank.
+        self._max_id = 0
+        self._ids = set()
+        self._by_category: Dict[str, List[int]] = {}
+        # Static fallback prompts for generate_followup_questions — built
+        # once here instead of re-created on every call.
+        self._static_followups = (
+            "Describe a small ritual that helps you reset.",
+            "When did you last feel most like yourself? Describe briefly.",
+            "What would you like to explore more deeply about yourself right now?"
+        )
         if question_file:
             self.load_question_bank()
 
+    def _rebuild_index(self):
+        """Recompute the id set, max id and category->indexes map in one pass."""
+        self._ids = set()
+        self._max_id = 0
+        self._by_category = {}
+        for idx, q in enumerate(self.question_bank):
+            qid = q.get("id", 0)
+            self._ids.add(qid)
+            if qid > self._max_id:
+                self._max_id = qid
+            self._by_category.setdefault(q.get("category", "general"), []).append(idx)
+
     def load_question_bank(self):
         """Load questions from JSON file; support multiple shapes and normalize to flat list."""
         try:
@@ -119,6 +189,7 @@ class QuizEngine:
                 _debug("No question_file provided to QuizEngine.")
                 self.question_bank = []
                 self.question_count = 0
+                self._rebuild_index()
                 return
 
             if not os.path.exists(self.question_file):
@@ -130,88 +201,117 @@ class QuizEngine:
                 else:
                     self.question_bank = []
                     self.question_count = 0
+                    self._rebuild_index()
                     return
 
             with open(self.question_file, "r", encoding="utf-8") as f:
-                raw = json.load(f)
+                raw = _json_read(f)
+
+            # Fast path: the overwhelmingly common shape is an
+            # already-normalized flat list (dict entries with unique int ids,
+            # category and text present). Detect that in one pass and skip
+            # the normalization and dedup walks entirely.
+            if isinstance(raw, list) and raw:
+                seen = set()
+                for q in raw:
+                    if not (isinstance(q, dict) and type(q.get("id")) is int
+                            and "text" in q and "category" in q and q["id"] not in seen):
+                        break
+                    seen.add(q["id"])
+                else:
+                    raw.sort(key=lambda x: x["id"])
+                    self.question_bank = raw
+                    self.question_count = len(raw)
+                    self._rebuild_index()
+                    _debug(f"Loaded {self.question_count} questions (fast path) from {self.question_file}")
+                    return
 
-            if _is_grouped_questions(raw):
-                _debug("Detected grouped question object — normalizing to flat list.")
+            shape = _detect_shape(raw)
+            _debug(f"Detected question file shape: {shape} — normalizing to flat list.")
+            if shape == "grouped":
                 normalized = _normalize_grouped_to_list(raw)
-            elif _is_enveloped_questions(raw):
-                _debug("Detected enveloped questions (questions key) — normalizing to flat list.")
+            elif shape == "enveloped":
                 normalized = _normalize_enveloped_to_list(raw)
-            elif isinstance(raw, list):
-                _debug("Detected flat list — normalizing entries.")
+            elif shape == "flat":
                 normalized = _normalize_flat_list(raw)
-            elif isinstance(raw, dict) and "questions" not in raw:
-                _debug("Top-level dict with non-enveloped format — attempting grouped normalization.")
-                normalized = _normalize_grouped_to_list(raw)
             else:
-                _debug("Unknown question file shape — attempting safe fallback.")
                 normalized = []
 
-            # Ensure unique ids
+            # Ensure unique ids — single pass. next_free only moves forward,
+            # so collisions resolve without the O(n) max(used_ids) rescan
+            # the old loop paid per duplicate.
             used_ids = set()
+            next_free = 1
             for i, q in enumerate(normalized):
                 if not isinstance(q, dict):
-                    normalized[i] = {"id": i+1, "category": "general", "text": str(q)}
-                else:
-                    if "id" not in q or q["id"] is None:
-                        q["id"] = i+1
-                    try:
-                        q["id"] = int(q["id"])
-                    except Exception:
-                        q["id"] = i+1
-                    if q["id"] in used_ids:
-                        new_id = max(used_ids) + 1 if used_ids else (i+1)
-                        q["id"] = new_id
-                    used_ids.add(q["id"])
-                    q.setdefault("category", q.get("category", "general"))
-                    q.setdefault("text", q.get("text", ""))
+                    q = normalized[i] = {"id": None, "category": "general", "text": str(q)}
+                try:
+                    qid = int(q["id"]) if q.get("id") is not None else i + 1
+                except Exception:
+                    qid = i + 1
+                if qid in used_ids:
+                    while next_free in used_ids:
+                        next_free += 1
+                    qid = next_free
+                q["id"] = qid
+                used_ids.add(qid)
+                if qid >= next_free:
+                    next_free = qid + 1
+                q.setdefault("category", "general")
+                q.setdefault("text", "")
 
             normalized.sort(key=lambda x: x.get("id", 0))
             self.question_bank = normalized
             self.question_count = len(self.question_bank)
+            self._rebuild_index()
             _debug(f"Loaded {self.question_count} questions from {self.question_file}")
         except Exception as e:
             print(f"[QuizEngine] Failed to load questions: {e}")
             _debug(f"Exception traceback suppressed for brevity.")
             self.question_bank = []
             self.question_count = 0
+            self._rebuild_index()
 
     def get_randomized_questions(self, n: int = 6) -> List[Dict]:
+        """Return a random sample of n questions.
+
+        The returned dicts are references into the bank, not copies — every
+        caller only serializes them, so the per-request dict() copies were
+        pure overhead. Treat the entries as read-only; mutate the bank via
+        add_question/load_question_bank instead.
+        """
         if not self.question_bank:
             _debug("Question bank empty — returning empty list.")
             return []
         n = max(1, min(n, len(self.question_bank)))
-        sample = random.sample(self.question_bank, n)
-        return [dict(q) for q in sample]
+        return _RNG.sample(self.question_bank, n)
 
     def add_question(self, question: Dict):
         try:
+            # _max_id/_ids make id assignment O(1) instead of re-scanning
+            # the whole bank per insert.
             if not isinstance(question, dict):
-                q_text = str(question)
-                new_id = (max([q.get("id", 0) for q in self.question_bank]) + 1) if self.question_bank else 1
-                question = {"id": new_id, "category": "general", "text": q_text}
+                question = {"id": self._max_id + 1, "category": "general", "text": str(question)}
 
             if "id" not in question or question["id"] is None:
-                question["id"] = (max([q.get("id", 0) for q in self.question_bank]) + 1) if self.question_bank else 1
+                question["id"] = self._max_id + 1
             else:
                 try:
                     question["id"] = int(question["id"])
                 except Exception:
-                    question["id"] = (max([q.get("id", 0) for q in self.question_bank]) + 1) if self.question_bank else 1
+                    question["id"] = self._max_id + 1
 
-            existing_ids = {q.get("id") for q in self.question_bank}
-            if question["id"] in existing_ids:
-                question["id"] = max(existing_ids) + 1
+            if question["id"] in self._ids:
+                question["id"] = self._max_id + 1
 
-            question.setdefault("category", question.get("category", "general"))
-            question.setdefault("text", question.get("text", ""))
+            question.setdefault("category", "general")
+            question.setdefault("text", "")
 
             self.question_bank.append({"id": int(question["id"]), "category": question["category"], "text": question["text"], **({"choices": question["choices"]} if "choices" in question else {})})
             self.question_count = len(self.question_bank)
+            self._ids.add(question["id"])
+            self._max_id = max(self._max_id, question["id"])
+            self._by_category.setdefault(question["category"], []).append(self.question_count - 1)
             _debug(f"Added question id={question['id']} category={question['category']!r}")
         except Exception as e:
             print(f"[QuizEngine] add_question failed: {e}")
@@ -228,8 +328,25 @@ class QuizEngine:
                     entry["choices"] = q["choices"]
                 to_write.append(entry)
 
-            with open(self.question_file, "w", encoding="utf-8") as f:
-                json.dump(to_write, f, indent=2, ensure_ascii=False)
+            # Write to a temp file in the same directory, then atomically
+            # rename over the target: readers never see a truncated file
+            # and a crash mid-write leaves the old bank intact.
+            dirn = os.path.dirname(self.question_file) or "."
+            tmp_name = None
+            try:
+                with tempfile.NamedTemporaryFile(
+                        "w", dir=dirn, delete=False, encoding="utf-8",
+                        prefix=".question.", suffix=".tmp") as tmp:
+                    _json_write(tmp, to_write)
+                    tmp_name = tmp.name
+                os.replace(tmp_name, self.question_file)
+            except Exception:
+                if tmp_name:
+                    try:
+                        os.unlink(tmp_name)
+                    except OSError:
+                        pass
+                raise
             _debug(f"Question bank saved ({len(to_write)} items) to {self.question_file}.")
         except Exception as e:
             print(f"[QuizEngine] Failed to save question bank: {e}")
@@ -240,7 +357,7 @@ class QuizEngine:
         """
         profile = profile or {}
         out = []
-        next_id = (max([q.get('id', 0) for q in self.question_bank]) + 1) if self.question_bank else 1
+        next_id = self._max_id + 1
 
         # If profile contains numeric answers like q_1: 4, use them
         try:
@@ -259,9 +376,9 @@ class QuizEngine:
                     trait = k.replace('q_', '')
                     templates.append(f"You rated {trait} highly. Tell a short story when this showed up recently.")
                     templates.append(f"How might you support {trait} more often in daily life?")
-            # Attempt to call process_quiz to get hints if present in module
+            # Ask process_quiz (same module) for richer hints; profiles can
+            # carry keys it does not accept, so guard the call itself.
             try:
-                from quiz_logic import process_quiz
                 hints = process_quiz(**({k: str(v) for k, v in profile.items() if isinstance(v, (int, str))}))
                 if isinstance(hints, dict):
                     # create questions based on a few hint keys
@@ -270,22 +387,13 @@ class QuizEngine:
                     if 'spirit_symbol' in hints:
                         templates.append(f"Your spirit symbol is {hints['spirit_symbol']}. Why does this image matter to you?")
             except Exception:
-                # process_quiz may not be importable in some contexts — ignore
                 pass
 
             # fallback generic prompts
-            templates.extend([
-                "Describe a small ritual that helps you reset.",
-                "When did you last feel most like yourself? Describe briefly.",
-                "What would you like to explore more deeply about yourself right now?"
-            ])
+            templates.extend(self._static_followups)
 
         except Exception:
-            templates = [
-                "Describe a small ritual that helps you reset.",
-                "When did you last feel most like yourself? Describe briefly.",
-                "What would you like to explore more deeply about yourself right now?"
-            ]
+            templates = list(self._static_followups)
 
         # Build n questions
         for i in range(n):
@@ -297,127 +405,183 @@ class QuizEngine:
 # Quiz Processing Functions
 # ======================
 
+# Trait hint tables and spirit symbols, hoisted to module scope: process_quiz
+# used to rebuild all six dicts and the symbol list per call (~50 allocations
+# per submission for data that never changes). The dict keys are string
+# literals, which CPython interns automatically, so lookups on the lowered
+# inputs take the identity-compare fast path.
+_ENERGY_MAP = {
+    "calm": "Reflective energy, steady and wise.",
+    "excited": "Radiant energy, bold and eager.",
+    "neutral": "Balanced energy, quietly powerful.",
+    "anxious": "Turbulent energy seeking clarity.",
+    "focused": "Directed energy, cutting through distractions."
+}
+
+_CLARITY_MAP = {
+    "clear": "Your focus cuts through illusions.",
+    "blurred": "You are learning to see the unseen.",
+    "wandering": "Your thoughts drift like clouds.",
+    "sharp": "Perception is acute; details are vivid.",
+    "distracted": "Eyes wander, but insight still forms."
+}
+
+_TRUST_MAP = {
+    "high": "Your heart opens easily to connection.",
+    "low": "You guard your truth like a sacred flame.",
+    "medium": "You balance faith with careful observation.",
+    "skeptical": "Doubt guides your learning, wisely.",
+    "forgiving": "Even past wounds teach grace."
+}
+
+_CREATIVITY_MAP = {
+    "low": "Innovation simmers quietly within.",
+    "moderate": "You weave ideas with ease.",
+    "high": "A torrent of imagination flows through you.",
+    "latent": "Hidden sparks of brilliance await discovery."
+}
+
+_PATIENCE_MAP = {
+    "low": "Action moves faster than thought.",
+    "medium": "You balance urgency with deliberation.",
+    "high": "Time bends around your calm resolve."
+}
+
+_EMPATHY_MAP = {
+    "low": "Observation over feeling guides you.",
+    "medium": "You connect meaningfully, when prompted.",
+    "high": "Hearts open wherever you tread."
+}
+
+_SPIRIT_SYMBOLS = (
+    ("Flame", "Ignites insight and courage."),
+    ("Wave", "Flows with change and intuition."),
+    ("Leaf", "Grounded growth and resilience."),
+    ("Wind", "Brings movement and new perspectives."),
+    ("Stone", "Steadfast, patient, and enduring."),
+    ("Star", "Illuminates hidden paths."),
+    ("Petal", "Gentle beauty and unfolding potential."),
+    ("Moon", "Cycles of reflection and emotion.")
+)
+
+# (hint key, lookup table, fallback answer, default hint) per trait, in the
+# positional order process_quiz receives them. Drives the fused
+# normalize-and-lookup loop below instead of six hand-written pairs.
+_TRAIT_DEFS = (
+    ("energy", _ENERGY_MAP, "neutral", "An undefined aura surrounds you."),
+    ("clarity", _CLARITY_MAP, "blurred", "Your inner lens adjusts to truth."),
+    ("trust", _TRUST_MAP, "low", "Trust flows with your intuition."),
+    ("creativity", _CREATIVITY_MAP, "moderate", "Ideas await their time to blossom."),
+    ("patience", _PATIENCE_MAP, "medium", "Time flows according to your pace."),
+    ("empathy", _EMPATHY_MAP, "medium", "Feelings ripple along your path.")
+)
+
 def process_quiz(mood: str = "neutral",
                  focus: str = "blurred",
                  trust: str = "low",
                  creativity: str = "moderate",
                  patience: str = "medium",
                  empathy: str = "medium") -> Dict[str, str]:
-
-    mood = (mood or "neutral").lower()
-    focus = (focus or "blurred").lower()
-    trust = (trust or "low").lower()
-    creativity = (creativity or "moderate").lower()
-    patience = (patience or "medium").lower()
-    empathy = (empathy or "medium").lower()
-
-    energy_map = {
-        "calm": "Reflective energy, steady and wise.",
-        "excited": "Radiant energy, bold and eager.",
-        "neutral": "Balanced energy, quietly powerful.",
-        "anxious": "Turbulent energy seeking clarity.",
-        "focused": "Directed energy, cutting through distractions."
-    }
-
-    clarity_map = {
-        "clear": "Your focus cuts through illusions.",
-        "blurred": "You are learning to see the unseen.",
-        "wandering": "Your thoughts drift like clouds.",
-        "sharp": "Perception is acute; details are vivid.",
-        "distracted": "Eyes wander, but insight still forms."
-    }
-
-    trust_map = {
-        "high": "Your heart opens easily to connection.",
-        "low": "You guard your truth like a sacred flame.",
-        "medium": "You balance faith with careful observation.",
-        "skeptical": "Doubt guides your learning, wisely.",
-        "forgiving": "Even past wounds teach grace."
-    }
-
-    creativity_map = {
-        "low": "Innovation simmers quietly within.",
-        "moderate": "You weave ideas with ease.",
-        "high": "A torrent of imagination flows through you.",
-        "latent": "Hidden sparks of brilliance await discovery."
-    }
-
-    patience_map = {
-        "low": "Action moves faster than thought.",
-        "medium": "You balance urgency with deliberation.",
-        "high": "Time bends around your calm resolve."
-    }
-
-    empathy_map = {
-        "low": "Observation over feeling guides you.",
-        "medium": "You connect meaningfully, when prompted.",
-        "high": "Hearts open wherever you tread."
-    }
-
-    spirit_symbols = [
-        ("Flame", "Ignites insight and courage."),
-        ("Wave", "Flows with change and intuition."),
-        ("Leaf", "Grounded growth and resilience."),
-        ("Wind", "Brings movement and new perspectives."),
-        ("Stone", "Steadfast, patient, and enduring."),
-        ("Star", "Illuminates hidden paths."),
-        ("Petal", "Gentle beauty and unfolding potential."),
-        ("Moon", "Cycles of reflection and emotion.")
-    ]
-    spirit_symbol, spirit_desc = random.choice(spirit_symbols)
-
-    hints = {
-        "energy": energy_map.get(mood, "An undefined aura surrounds you."),
-        "clarity": clarity_map.get(focus, "Your inner lens adjusts to truth."),
-        "trust": trust_map.get(trust, "Trust flows with your intuition."),
-        "creativity": creativity_map.get(creativity, "Ideas await their time to blossom."),
-        "patience": patience_map.get(patience, "Time flows according to your pace."),
-        "empathy": empathy_map.get(empathy, "Feelings ripple along your path."),
-        "spirit_symbol": spirit_symbol,
-        "spirit_description": spirit_desc,
-        "message": generate_insight_message(mood, focus, trust, creativity, patience, empathy)
-    }
-
-    hints["trait_scores"] = compute_trait_scores(mood, focus, trust, creativity, patience, empathy)
+    # Deliberately a plain dict: the hints are the wire format — /submit
+    # merges astrology keys in with dict.update and ships the result as
+    # JSON, and every consumer reads it with .get()/'in'. A slotted class
+    # would only be converted back to a dict at each of those boundaries.
+    values, hint_texts, scores = _process_quiz_deterministic(
+        mood, focus, trust, creativity, patience, empathy)
+
+    hints = dict(zip(_HINT_KEYS, hint_texts))
+    spirit_symbol, spirit_desc = _RNG.choice(_SPIRIT_SYMBOLS)
+    hints["spirit_symbol"] = spirit_symbol
+    hints["spirit_description"] = spirit_desc
+    hints["message"] = generate_insight_message(*values)
+
+    hints["trait_scores"] = dict(zip(_TRAIT_NAMES, scores))
     hints["ml_vector"] = generate_ml_vector(hints)
 
     return hints
 
+_TRAIT_NAMES = ("mood", "focus", "trust", "creativity", "patience", "empathy")
+_HINT_KEYS = tuple(d[0] for d in _TRAIT_DEFS)
+
+@lru_cache(maxsize=2048)
+def _process_quiz_deterministic(mood, focus, trust, creativity, patience, empathy):
+    """Everything in process_quiz that is a pure function of the six answers:
+    normalized values, hint texts and trait scores. The answer space is a
+    small cartesian product, so after warmup the whole deterministic half is
+    one tuple-keyed cache hit. Returns only immutable tuples — callers build
+    their own dicts, so the cached entries can never be mutated."""
+    values = []
+    hint_texts = []
+    for raw, (_out_key, table, fallback, default) in zip(
+            (mood, focus, trust, creativity, patience, empathy), _TRAIT_DEFS):
+        val = (raw or fallback).lower()
+        values.append(val)
+        hint_texts.append(table.get(val, default))
+    g = _SCORE_MAP.get
+    scores = tuple(g(v, 3) for v in values)
+    return tuple(values), tuple(hint_texts), scores
+
 # --------------------- Helpers ---------------------
 
+# Insight templates, compiled once at import from {field} form to
+# ('%s' template, positional indexes into the trait argument tuple).
+# str.format re-parses the template and takes all seven keywords on every
+# call even though each template uses at most two; C-level %-interpolation
+# with just the needed values skips both costs. 'clarity' aliases focus.
+_INSIGHT_FIELD_INDEX = {
+    "mood": 0, "focus": 1, "trust": 2,
+    "creativity": 3, "patience": 4, "empathy": 5, "clarity": 1
+}
+
+def _compile_insight_templates(raw_templates):
+    import string
+    compiled = []
+    for tmpl in raw_templates:
+        fields = [f for _, f, _, _ in string.Formatter().parse(tmpl) if f]
+        compiled.append((
+            re.sub(r"\{\w+\}", "%s", tmpl),
+            tuple(_INSIGHT_FIELD_INDEX[f] for f in fields)
+        ))
+    return tuple(compiled)
+
+_INSIGHT_TEMPLATES = _compile_insight_templates((
+    "Your inner {mood} guides how you perceive the world.",
+    "Balance {focus} with your natural {creativity}.",
+    "A mix of {trust} and {empathy} shapes your choices today.",
+    "Patience {patience} allows your insights to flourish.",
+    "Flow with {creativity} and observe how {clarity} emerges."
+))
+
 def generate_insight_message(mood: str, focus: str, trust: str,
                              creativity: str, patience: str, empathy: str) -> str:
-    templates = [
-        "Your inner {mood} guides how you perceive the world.",
-        "Balance {focus} with your natural {creativity}.",
-        "A mix of {trust} and {empathy} shapes your choices today.",
-        "Patience {patience} allows your insights to flourish.",
-        "Flow with {creativity} and observe how {clarity} emerges."
-    ]
-    template = random.choice(templates)
-    return template.format(
-        mood=mood,
-        focus=focus,
-        trust=trust,
-        creativity=creativity,
-        patience=patience,
-        empathy=empathy,
-        clarity=focus
-    )
+    args = (mood, focus, trust, creativity, patience, empathy)
+    template, idxs = _RNG.choice(_INSIGHT_TEMPLATES)
+    return template % tuple(args[i] for i in idxs)
+
+# Answer -> score lookup, hoisted to module scope so scoring is six dict
+# probes with no per-call table construction.
+_SCORE_MAP = {
+    "low": 1, "medium": 3, "moderate": 3, "high": 5,
+    "calm": 3, "neutral": 3, "excited": 4,
+    "wandering": 2, "clear": 5, "focused": 5, "sharp": 5, "distracted": 2,
+    "skeptical": 2, "forgiving": 4, "latent": 2, "anxious": 2
+}
 
 def compute_trait_scores(mood: str, focus: str, trust: str,
                          creativity: str, patience: str, empathy: str) -> Dict[str, int]:
-    score_map = {
-        "low": 1, "medium": 3, "moderate": 3, "high": 5,
-        "calm": 3, "neutral": 3, "excited": 4,
-        "wandering": 2, "clear": 5, "focused": 5, "sharp": 5, "distracted": 2,
-        "skeptical": 2, "forgiving": 4, "latent": 2, "anxious": 2
+    g = _SCORE_MAP.get
+    return {
+        "mood": g(mood, 3), "focus": g(focus, 3), "trust": g(trust, 3),
+        "creativity": g(creativity, 3), "patience": g(patience, 3),
+        "empathy": g(empathy, 3)
     }
-    scores = {}
-    for trait, val in [("mood", mood), ("focus", focus), ("trust", trust),
-                       ("creativity", creativity), ("patience", patience), ("empathy", empathy)]:
-        scores[trait] = score_map.get(val, 3)
-    return scores
+
+def compute_trait_scores_batch(rows) -> List[tuple]:
+    """Score many (mood, focus, trust, creativity, patience, empathy)
+    tuples at once — one bound-method lookup for the whole batch, for
+    analytics passes over the full history."""
+    g = _SCORE_MAP.get
+    return [tuple(g(v, 3) for v in row) for row in rows]
 
 def summarize_traits(hints: Dict[str, str]) -> str:
     return (f"Energy: {hints.get('energy')} | "
@@ -428,39 +592,83 @@ def summarize_traits(hints: Dict[str, str]) -> str:
             f"Empathy: {hints.get('empathy')} | "
             f"Symbol: {hints.get('spirit_symbol')} ({hints.get('spirit_description')})")
 
+# Answer pools for the demo/fuzz randomizer, hoisted so each call is pure
+# picks with no per-call dict-of-lists rebuild.
+_TRAIT_OPTIONS = {
+    "mood": ("calm", "neutral", "excited", "anxious", "focused"),
+    "focus": ("clear", "blurred", "wandering", "sharp", "distracted"),
+    "trust": ("high", "medium", "low", "skeptical", "forgiving"),
+    "creativity": ("low", "moderate", "high", "latent"),
+    "patience": ("low", "medium", "high"),
+    "empathy": ("low", "medium", "high")
+}
+
 def randomize_quiz_traits(traits: List[str] = None) -> Dict[str, str]:
-    options = {
-        "mood": ["calm", "neutral", "excited", "anxious", "focused"],
-        "focus": ["clear", "blurred", "wandering", "sharp", "distracted"],
-        "trust": ["high", "medium", "low", "skeptical", "forgiving"],
-        "creativity": ["low", "moderate", "high", "latent"],
-        "patience": ["low", "medium", "high"],
-        "empathy": ["low", "medium", "high"]
-    }
-    traits = traits or list(options.keys())
-    return {t: random.choice(options[t]) for t in traits}
+    return {t: _RNG.choice(_TRAIT_OPTIONS[t]) for t in (traits or _TRAIT_NAMES)}
 
 # ======================
 # ML + Analytics Enhancements
 # ======================
+# Symbol name -> ordinal, built once: there are only eight symbols, so an
+# index lookup is both cheaper and denser than any hash of the name.
+# Unknown symbols map to 0, matching the Flame default elsewhere.
+_SYMBOL_ID = {name: i for i, (name, _desc) in enumerate(_SPIRIT_SYMBOLS)}
+
 def generate_ml_vector(hints: Dict[str, str]) -> Dict[str, int]:
     vector = hints.get("trait_scores", {}).copy()
-    vector["spirit_symbol_id"] = hash(hints.get("spirit_symbol", "")) % 100
+    vector["spirit_symbol_id"] = _SYMBOL_ID.get(hints.get("spirit_symbol", ""), 0)
     return vector
 
-def save_ml_record(hints: Dict[str, str], filepath: str = "ml_training.json"):
+def _migrate_ml_records(filepath: str):
+    """One-shot conversion of a legacy list-JSON ML file to JSONL."""
+    if not filepath.endswith(".jsonl"):
+        return
+    legacy = filepath[:-1]  # ml_training.jsonl -> ml_training.json
+    if os.path.exists(filepath) or not os.path.exists(legacy):
+        return
+    try:
+        with open(legacy, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            with open(filepath, "w", encoding="utf-8") as f:
+                f.writelines(_json_line(rec) + "\n" for rec in data)
+        os.replace(legacy, legacy + ".migrated")
+        _debug(f"Migrated {legacy} to JSONL at {filepath}")
+    except Exception:
+        _log.exception("ML record migration failed")
+
+def save_ml_record(hints: Dict[str, str], filepath: str = "ml_training.jsonl"):
+    """Append one ML record as a JSONL line.
+
+    The old implementation parsed and rewrote the whole list-JSON file per
+    record — O(N) I/O per quiz submission. An append is O(1) regardless of
+    history size; any legacy list file is converted once on first use.
+    """
     record = hints.get("ml_vector", {}).copy()
-    record["timestamp"] = datetime.now().isoformat()
+    # Integer epoch nanoseconds: cheaper to produce and encode than an
+    # ISO string, and smaller on disk. Consumers that want wall-clock
+    # text can datetime.fromtimestamp(ts / 1e9) on demand.
+    record["timestamp_ns"] = time.time_ns()
     try:
-        data = []
-        if os.path.exists(filepath):
-            with open(filepath, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        data.append(record)
-        with open(filepath, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
-    except Exception as e:
-        print(f"[quiz_logic] Failed to save ML record: {e}")
+        _migrate_ml_records(filepath)
+        with open(filepath, "a", encoding="utf-8") as f:
+            f.write(_json_line(record) + "\n")
+    except Exception:
+        _log.exception("Failed to save ML record")
+
+def load_ml_records(filepath: str = "ml_training.jsonl"):
+    """Yield ML records lazily, one JSONL line at a time."""
+    try:
+        with open(filepath, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    try:
+                        yield _json_loads(line)
+                    except Exception:
+                        continue
+    except FileNotFoundError:
+        return
 
 # ======================
 # Module Test
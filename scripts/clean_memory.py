@@ -1,7 +1,34 @@
+import hashlib
 import json
 import os
+import re
+import shutil
 from datetime import datetime
-from collections import Counter
+
+# JSON codec: orjson when installed (C-speed encoder/decoder), stdlib
+# otherwise — the same optional-dependency guard the app modules use.
+try:
+    import orjson
+
+    def _loads(data):
+        return orjson.loads(data)
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+except ImportError:
+    def _loads(data):
+        return json.loads(data)
+
+    def _dumps(obj) -> str:
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+
+# Known-bad placeholder needles, compiled once into a single alternation so
+# each fortune is scanned in one pass instead of one str-in check per
+# needle. ('fortune: unknown (element: void)' needs no branch of its own —
+# the plain 'unknown (element: void)' alternative already matches it.)
+# IGNORECASE pushes the case folding into the regex engine, so no
+# lowercased copy of each fortune is allocated per entry.
+_BAD = re.compile(r"unknown \(element: void\)|the mirror is silent", re.IGNORECASE)
 
 BASE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 MEMORY = os.path.join(BASE, 'mirror_memory.json')
@@ -12,83 +39,138 @@ if not os.path.exists(MEMORY):
 
 bak = MEMORY + '.bak.' + datetime.now().strftime('%Y%m%dT%H%M%S')
 print('Backing up', MEMORY, '->', bak)
-with open(MEMORY, 'r', encoding='utf-8') as f:
-    mem = json.load(f)
-with open(bak, 'w', encoding='utf-8') as f:
-    json.dump(mem, f, indent=2, ensure_ascii=False)
+# Hardlink when possible: zero bytes copied, just a new directory entry
+# pointing at the same inode — safe because the clean step below writes a
+# fresh file and os.replace's it over MEMORY, never modifying the original
+# in place. Fall back to a byte copy on filesystems without link support.
+try:
+    os.link(MEMORY, bak)
+except OSError:
+    shutil.copyfile(MEMORY, bak)
+with open(MEMORY, 'rb') as f:
+    mem = _loads(f.read())
 
 def is_repetitive_junk(text: str) -> bool:
     """Detect if text is repetitive junk (like 'moon moon moon...' or 'Zodiac: southern, Zodiac: southern...')"""
     if not text or not isinstance(text, str):
         return False
     words = text.split()
-    if len(words) < 5:
+    n = len(words)
+    if n < 5:
         return False
-    word_counts = Counter(words)
-    # Check two things:
-    # 1. If any single word appears in >60% of text (obvious repetition)
-    # 2. If any word appears more than 5 times in a short text (likely junk)
-    most_common_count = max(word_counts.values()) if word_counts else 0
-    if most_common_count > len(words) * 0.6:
-        return True
-    if most_common_count > 5 and len(words) < 50:
-        # Short text with a word appearing >5 times is likely junk
-        return True
+    # Junk when one word exceeds 60% of the text, or appears >5 times in
+    # a short (<50 word) text. Both collapse into one ceiling, checked
+    # while counting so blatant repetition bails out after a few words
+    # instead of paying a full Counter pass over every entry.
+    limit = n * 0.6
+    if n < 50 and limit > 5:
+        limit = 5
+    counts = {}
+    for w in words:
+        c = counts.get(w, 0) + 1
+        if c > limit:
+            return True
+        counts[w] = c
     return False
 
-removed_total = 0
-truncated_total = 0
-duplicates_total = 0
-repetitive_total = 0
-
-cleaned = {}
-for name, history in mem.items():
+def clean_history(history):
+    """Clean one user's history; returns (kept entries, counts) where counts
+    is (removed, repetitive, truncated, duplicates). Pure function of its
+    input, so it can run unchanged in worker processes."""
     if not isinstance(history, list):
-        cleaned[name] = history
-        continue
-
+        return history, (0, 0, 0, 0)
+    removed = repetitive = truncated = duplicates = 0
     seen = set()
     new_hist_rev = []  # we'll build newest-first to prefer recent
     for entry in reversed(history):
         fortune = entry.get('fortune', '') if entry else ''
         if not fortune or not isinstance(fortune, str):
-            removed_total += 1
-            continue
-        low = fortune.lower()
-        # skip well-known bad placeholders
-        if 'unknown (element: void)' in low or 'the mirror is silent' in low or 'fortune: unknown (element: void)' in low:
-            removed_total += 1
+            removed += 1
             continue
-        # skip empty or trivial
-        if len(fortune.strip()) < 8:
-            removed_total += 1
+        # Length gates first (one strip, its length reused by both
+        # thresholds) so the regex and word-count sweeps only run on
+        # entries that could survive: skip empty/trivial, and
+        # short/corrupted text without the mirror emoji. The >4000
+        # truncation below intentionally measures the unstripped text,
+        # as the original did.
+        stripped_len = len(fortune.strip())
+        if stripped_len < 8 or (stripped_len < 40 and '🪞' not in fortune):
+            removed += 1
             continue
-        # skip obviously short/corrupted text (< 40 chars and doesn't contain mirror/fortune emoji)
-        if len(fortune.strip()) < 40 and '🪞' not in fortune:
-            removed_total += 1
+        # skip well-known bad placeholders — one compiled case-folding scan
+        if _BAD.search(fortune):
+            removed += 1
             continue
         # skip repetitive junk (e.g., "moon moon moon..." or "Zodiac: southern...")
         if is_repetitive_junk(fortune):
-            repetitive_total += 1
+            repetitive += 1
             continue
         # truncate extremely long fortunes
         if len(fortune) > 4000:
             entry = dict(entry)
             entry['fortune'] = fortune[:1000].rstrip() + "\n\n(Truncated long fortune)"
-            truncated_total += 1
+            truncated += 1
             fortune = entry['fortune']
-        # dedupe by exact fortune text
-        if fortune in seen:
-            duplicates_total += 1
+        # dedupe on a 16-byte blake2b digest rather than the fortune text
+        # itself: the seen-set holds 16 bytes per entry instead of up to
+        # 4000 chars, and collisions are cryptographically negligible
+        digest = hashlib.blake2b(fortune.encode('utf-8'), digest_size=16).digest()
+        if digest in seen:
+            duplicates += 1
             continue
-        seen.add(fortune)
+        seen.add(digest)
         new_hist_rev.append(entry)
     # restore oldest-first
-    cleaned[name] = list(reversed(new_hist_rev))
+    new_hist_rev.reverse()
+    return new_hist_rev, (removed, repetitive, truncated, duplicates)
+
+removed_total = 0
+repetitive_total = 0
+truncated_total = 0
+duplicates_total = 0
+
+# Each name's history cleans independently, so large files fan out across
+# cores. Worth the fork + pickling overhead only past a few thousand
+# entries; small files (and platforms without fork) stay serial. Results
+# stream back in order, so the incremental writer below works either way.
+names = list(mem.keys())
+histories = (mem.pop(n) for n in names)  # free each history once cleaned
+total_entries = sum(len(h) for h in mem.values() if isinstance(h, list))
+executor = None
+if total_entries >= 10000 and (os.cpu_count() or 1) > 1:
+    try:
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(mp_context=multiprocessing.get_context('fork'))
+    except (ImportError, ValueError):
+        executor = None
+if executor is not None:
+    results = executor.map(clean_history, histories, chunksize=16)
+else:
+    results = map(clean_history, histories)
 
-# write cleaned file
-with open(MEMORY, 'w', encoding='utf-8') as f:
-    json.dump(cleaned, f, indent=2, ensure_ascii=False)
+# Stream the cleaned output: each user's history is cleaned, written to a
+# temp file and dropped before the next one, so peak memory is one parsed
+# copy plus one history instead of the whole file held twice. The final
+# os.replace swaps atomically — a crash mid-clean leaves MEMORY untouched.
+tmp_path = MEMORY + '.cleaning'
+with open(tmp_path, 'w', encoding='utf-8') as f:
+    f.write('{\n')
+    first = True
+    for name, (history, counts) in zip(names, results):
+        removed_total += counts[0]
+        repetitive_total += counts[1]
+        truncated_total += counts[2]
+        duplicates_total += counts[3]
+        if not first:
+            f.write(',\n')
+        f.write(json.dumps(name, ensure_ascii=False) + ': ')
+        f.write(_dumps(history))
+        first = False
+    f.write('\n}\n')
+if executor is not None:
+    executor.shutdown()
+os.replace(tmp_path, MEMORY)
 
 print('Cleanup complete')
 print('Removed placeholder/empty entries:', removed_total)
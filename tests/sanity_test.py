@@ -39,9 +39,16 @@ def test_fortune_page():
     assert "Mirror" in r.text or "mirror" in r.text
 
 
+def test_concurrent_smoke():
+    # The four checks hit independent endpoints; running them together
+    # also exercises the app under concurrent requests.
+    from concurrent.futures import ThreadPoolExecutor
+    checks = (test_landing, test_quizdata, test_submit_json, test_fortune_page)
+    with ThreadPoolExecutor(max_workers=len(checks)) as pool:
+        for future in [pool.submit(c) for c in checks]:
+            future.result()
+
+
 if __name__ == "__main__":
-    test_landing()
-    test_quizdata()
-    test_submit_json()
-    test_fortune_page()
+    test_concurrent_smoke()
     print("All sanity checks passed")